@@ -38,6 +38,8 @@ else:
     print(f"Superuser '{username}' already exists.")
 EOF
 
-python manage.py rqworker default &
-
+# SERVER_MODE=asgi startet uvicorn-Worker für die async HLS-Auslieferung
+if [ "$SERVER_MODE" = "asgi" ]; then
+  exec gunicorn core.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:8000 --reload
+fi
 exec gunicorn core.wsgi:application --bind 0.0.0.0:8000 --reload
@@ -0,0 +1,198 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded in-process cache with per-entry expiry.
+
+    Used as the first cache level in front of Redis for small, hot values.
+    Entries are evicted least-recently-used first once maxsize is reached.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value, or default if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Stores a value, evicting the least recently used entries if full.
+        """
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Removes a value if it is cached.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Removes all values.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class ByteLRUCache:
+    """
+    A thread-safe LRU cache of bytes values bounded by their total size.
+
+    Values larger than max_entry_bytes are never stored. Hits, misses and
+    evictions are counted so the hit ratio can be monitored.
+    """
+
+    def __init__(self, max_bytes, max_entry_bytes):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def accepts(self, length):
+        """
+        Returns whether a value of length bytes would be cached.
+        """
+        return 0 < length <= self.max_entry_bytes
+
+    def get(self, key):
+        """
+        Returns the cached bytes, or None on a miss.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Stores bytes, evicting the least recently used entries to make room.
+        """
+        if not self.accepts(len(value)):
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Removes all values; the counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """
+        Returns the size, entry count and counters of the cache.
+        """
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "max_bytes": self.max_bytes,
+                "bytes": self.size,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / requests, 4) if requests else None,
+            }
+
+
+class CacheInvalidator:
+    """
+    Drops keys from an LRUCache in every process through Redis pub/sub.
+
+    Each process subscribes to the channel in a daemon thread, started on
+    first use so that every forked worker gets its own. The cache is
+    cleared whenever the subscription is (re)established, since messages
+    sent while disconnected are lost; the cache TTL bounds staleness if a
+    message is missed anyway.
+    """
+
+    def __init__(self, channel, cache):
+        self.channel = channel
+        self.cache = cache
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = get_redis_connection("default").pubsub(
+                    ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.cache.clear()
+                for message in pubsub.listen():
+                    for key in message["data"].decode().split("\n"):
+                        self.cache.delete(key)
+            except RedisError as exc:
+                logger.warning("Listener of %s disconnected: %s",
+                               self.channel, exc)
+                self.cache.clear()
+                time.sleep(1)
+
+    def ensure_listener(self):
+        """
+        Starts the listener thread once per process.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._listen, name=self.channel,
+                                 daemon=True).start()
+                self._pid = os.getpid()
+
+    def invalidate(self, *keys):
+        """
+        Drops string keys from the cache of this and every other process.
+        """
+        for key in keys:
+            self.cache.delete(key)
+        get_redis_connection("default").publish(self.channel, "\n".join(keys))
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+import django_rq
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django_redis import get_redis_connection
+
+
+def _chain_key(path):
+    """
+    Returns the Redis key marking the periodic job chain of path as alive.
+    """
+    return f"videoflix:periodic:{path}"
+
+
+def _interval(path):
+    """
+    Returns the configured interval of a periodic job, or None if removed.
+    """
+    return next((job["interval"] for job in settings.RQ_PERIODIC_JOBS
+                 if job["func"] == path), None)
+
+
+def _schedule(path, interval):
+    """
+    Schedules the next run of a periodic job on the maintenance queue.
+
+    Scheduled jobs are moved to the queue by a worker started with
+    --with-scheduler, see RQ_WORKER_POOL.
+    """
+    django_rq.get_queue('maintenance').enqueue_in(
+        timedelta(seconds=interval), run_periodic_job, path)
+
+
+def run_periodic_job(path):
+    """
+    Run one job of RQ_PERIODIC_JOBS and schedule its next run.
+
+    The next run is scheduled even if the job raises, so one failure does
+    not end the chain. Jobs removed from the setting are not rescheduled.
+    """
+    try:
+        import_string(path)()
+    finally:
+        interval = _interval(path)
+        if interval:
+            get_redis_connection("default").set(
+                _chain_key(path), 1, ex=interval * 3)
+            _schedule(path, interval)
+
+
+def ensure_periodic_jobs():
+    """
+    Start the chain of every periodic job that is not scheduled yet.
+
+    The first run is enqueued right away. Each run refreshes its chain
+    key, so a chain is only started again after three intervals without
+    a run.
+    """
+    redis = get_redis_connection("default")
+    for job in settings.RQ_PERIODIC_JOBS:
+        if redis.set(_chain_key(job["func"]), 1, nx=True,
+                     ex=job["interval"] * 3):
+            django_rq.get_queue('maintenance').enqueue(
+                run_periodic_job, job["func"])
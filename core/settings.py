@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'rest_framework',
     'rest_framework_simplejwt.token_blacklist',
@@ -63,6 +64,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# "wsgi" runs gunicorn with sync workers, "asgi" runs gunicorn with
+# uvicorn workers and serves playlists and segments from async views.
+# WhiteNoise is sync-only middleware and would push every ASGI request
+# through a thread, so under ASGI static files are left to nginx.
+SERVER_MODE = os.environ.get("SERVER_MODE", default="wsgi")
+if SERVER_MODE == "asgi":
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -159,22 +168,166 @@ CACHES = {
     }
 }
 
+RQ_CONNECTION = {
+    'HOST': os.environ.get("REDIS_HOST", default="redis"),
+    'PORT': os.environ.get("REDIS_PORT", default=6379),
+    'DB': os.environ.get("REDIS_DB", default=0),
+    'REDIS_CLIENT_KWARGS': {},
+}
+
 RQ_QUEUES = {
-    'default': {
-        'HOST': os.environ.get("REDIS_HOST", default="redis"),
-        'PORT': os.environ.get("REDIS_PORT", default=6379),
-        'DB': os.environ.get("REDIS_DB", default=0),
-        'DEFAULT_TIMEOUT': 900,
-        'REDIS_CLIENT_KWARGS': {},
-    },
+    'default': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 900},
+    'transcode-high': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 3600},
+    'transcode-bulk': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 3600},
+    'email': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 60},
+    'maintenance': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 900},
 }
 
+# Threads of one transcoding job. A job encodes all its renditions in one
+# ffmpeg run and splits these threads among them, so transcoding workers are
+# sized so that their jobs together use all available cores.
+VIDEO_TRANSCODE_THREADS = int(
+    os.environ.get("VIDEO_TRANSCODE_THREADS", default=6))
+
+# Worker groups started by `manage.py rqworkerpool`. Each worker serves its
+# queues in the listed order, so earlier queues have priority. "auto" sizes a
+# group to the available cores divided by VIDEO_TRANSCODE_THREADS; the single
+# transcode-high worker keeps a slot free for new uploads while the bulk
+# queue is busy.
+RQ_WORKER_POOL = [
+    {'queues': ['transcode-high'], 'workers': 1},
+    {'queues': ['transcode-high', 'transcode-bulk'], 'workers': 'auto'},
+    {'queues': ['email'], 'workers': 1},
+    {'queues': ['maintenance', 'default'], 'workers': 1, 'scheduler': True},
+]
+
+# Jobs run every "interval" seconds on the maintenance queue. Each run
+# schedules the next one, which needs the scheduler of the maintenance
+# worker; rqworkerpool starts the chains.
+RQ_PERIODIC_JOBS = [
+    {'func': 'videos_app.api.tasks.flush_watch_progress', 'interval': 60},
+    {'func': 'videos_app.api.tasks.rollup_video_stats', 'interval': 300},
+    {'func': 'users_app.api.tasks.purge_token_tables', 'interval': 60 * 60},
+    {'func': 'videos_app.api.tasks.expire_stale_uploads', 'interval': 60 * 60},
+]
+
+# Sources at least this long (in seconds) are split into chunks that are
+# transcoded in parallel by all available RQ workers.
+VIDEO_CHUNKED_TRANSCODE_MIN_DURATION = int(
+    os.environ.get("VIDEO_CHUNKED_TRANSCODE_MIN_DURATION", default=600))
+VIDEO_TRANSCODE_CHUNK_SECONDS = int(
+    os.environ.get("VIDEO_TRANSCODE_CHUNK_SECONDS", default=120))
+
+# "fmp4" writes every rendition as one fragmented MP4 addressed with byte
+# ranges; "ts" writes one MPEG-TS file per segment.
+VIDEO_HLS_SEGMENT_FORMAT = os.environ.get(
+    "VIDEO_HLS_SEGMENT_FORMAT", default="fmp4")
+
+# How playlists and segments are delivered after authentication:
+# "direct" streams them from Django, "x-accel-redirect" (nginx) and
+# "x-sendfile" return an internal redirect header so the front proxy sends
+# the file with sendfile. VIDEO_ACCEL_REDIRECT_PREFIX must match the
+# internal nginx location that aliases MEDIA_ROOT.
+VIDEO_DELIVERY_MODE = os.environ.get("VIDEO_DELIVERY_MODE", default="direct")
+VIDEO_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+
+# Segments never change once written; playlists are revalidated quickly.
+VIDEO_SEGMENT_CACHE_CONTROL = "private, max-age=31536000, immutable"
+VIDEO_PLAYLIST_CACHE_CONTROL = "private, max-age=5, must-revalidate"
+
+# Playlists hand out segment URLs signed for VIDEO_SIGNED_URL_TTL seconds,
+# with the expiry rounded up to VIDEO_SIGNED_URL_WINDOW. The URL itself is
+# the credential, so signed segments may be cached publicly.
+VIDEO_SIGNED_URL_TTL = 60 * 60 * 4
+VIDEO_SIGNED_URL_WINDOW = 60 * 10
+VIDEO_SIGNED_SEGMENT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Authenticated users are cached per process (USER_CACHE_SIZE users for
+# USER_CACHE_TTL seconds) and dropped from every process when saved.
+USER_CACHE_SIZE = 4096
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", default=60))
+
+# Video id -> uuid lookups, rendition lists and playlist bodies are cached
+# per process (VIDEO_LOCAL_CACHE_SIZE entries for VIDEO_LOCAL_CACHE_TTL
+# seconds) in front of Redis (VIDEO_CACHE_TIMEOUT seconds). Changes to a
+# video drop the copies of every process over Redis pub/sub.
+VIDEO_LOCAL_CACHE_SIZE = 2048
+VIDEO_LOCAL_CACHE_TTL = 60
+VIDEO_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Catalog pages are cached in Redis for VIDEO_CATALOG_CACHE_TIMEOUT seconds
+# or until any video changes, and clients revalidate them with their ETag.
+VIDEO_CATALOG_CACHE_TIMEOUT = 60 * 10
+VIDEO_CATALOG_CACHE_CONTROL = "private, no-cache"
+
+# Text search configuration used to build and query the video search vector.
+VIDEO_SEARCH_CONFIG = os.environ.get("VIDEO_SEARCH_CONFIG", default="english")
+
+# Playback positions live in Redis for VIDEO_WATCH_PROGRESS_TTL seconds
+# after the last write and are flushed to Postgres periodically. Videos
+# watched beyond VIDEO_WATCH_COMPLETE_RATIO of their duration drop out of
+# "continue watching", which lists up to VIDEO_CONTINUE_WATCHING_LIMIT.
+VIDEO_WATCH_PROGRESS_TTL = 60 * 60 * 24 * 30
+VIDEO_WATCH_COMPLETE_RATIO = 0.95
+VIDEO_CONTINUE_WATCHING_LIMIT = 20
+
+# A play counts half as much for trending after every
+# VIDEO_TRENDING_HALF_LIFE seconds; the trending row lists up to
+# VIDEO_TRENDING_LIMIT videos.
+VIDEO_TRENDING_HALF_LIFE = int(
+    os.environ.get("VIDEO_TRENDING_HALF_LIFE", default=60 * 60 * 6))
+VIDEO_TRENDING_LIMIT = 20
+
+# A request appending to a resumable upload holds its lock for
+# VIDEO_UPLOAD_LOCK_TIMEOUT seconds after every written block. Unfinished
+# uploads without a chunk for VIDEO_UPLOAD_EXPIRY seconds are deleted.
+VIDEO_UPLOAD_LOCK_TIMEOUT = 60
+VIDEO_UPLOAD_EXPIRY = int(
+    os.environ.get("VIDEO_UPLOAD_EXPIRY", default=60 * 60 * 24))
+
+# Number of newest ready videos per category in the home feed snapshot.
+VIDEO_HOME_FEED_LIMIT = 20
+
+# Segment bytes are kept in a per-process LRU cache of at most
+# VIDEO_SEGMENT_CACHE_BYTES (0 disables it); byte ranges larger than
+# VIDEO_SEGMENT_CACHE_MAX_ENTRY_BYTES are always streamed from disk. Once a
+# video is transcoded the first VIDEO_PREWARM_SEGMENTS segments of every
+# rendition are read ahead into the page cache.
+VIDEO_SEGMENT_CACHE_BYTES = int(os.environ.get(
+    "VIDEO_SEGMENT_CACHE_BYTES", default=64 * 1024 * 1024))
+VIDEO_SEGMENT_CACHE_MAX_ENTRY_BYTES = 4 * 1024 * 1024
+VIDEO_PREWARM_SEGMENTS = 3
+
+# Transcoding progress is written to Redis at most every
+# VIDEO_PROGRESS_INTERVAL seconds and expires after VIDEO_PROGRESS_TTL.
+VIDEO_PROGRESS_INTERVAL = 2
+VIDEO_PROGRESS_TTL = 60 * 60 * 24
+
+# Widths of the resized thumbnail variants and the layout of the trickplay
+# sprite sheets used for scrub-bar previews.
+VIDEO_THUMBNAIL_WIDTHS = [320, 640, 1280]
+VIDEO_TRICKPLAY_INTERVAL = 10
+VIDEO_TRICKPLAY_WIDTH = 160
+VIDEO_TRICKPLAY_COLUMNS = 10
+VIDEO_TRICKPLAY_ROWS = 10
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'users_app.authentication.CookieJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-    )
+    ),
+    # Login attempts per client IP and per account email, counted over a
+    # sliding window in Redis (users_app.api.throttling).
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get("LOGIN_THROTTLE_IP_RATE", default="30/min"),
+        'login_email': os.environ.get("LOGIN_THROTTLE_EMAIL_RATE", default="5/min"),
+    },
+    # Number of proxies in front of Django that append the client address
+    # to X-Forwarded-For. With 0 the client IP is REMOTE_ADDR; set it to 1
+    # only when Django is reachable through nginx alone, otherwise clients
+    # could pick their own IP.
+    'NUM_PROXIES': int(os.environ.get("TRUSTED_PROXY_COUNT", default=0)),
 }
 
 
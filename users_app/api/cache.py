@@ -0,0 +1,42 @@
+import copy
+
+from django.conf import settings
+
+from core.cache import CacheInvalidator, LRUCache
+
+
+USER_INVALIDATION_CHANNEL = "videoflix:user-invalidation"
+
+user_cache = LRUCache(maxsize=settings.USER_CACHE_SIZE,
+                      ttl=settings.USER_CACHE_TTL)
+
+user_cache_invalidator = CacheInvalidator(USER_INVALIDATION_CHANNEL, user_cache)
+
+
+def get_cached_user(user_id):
+    """
+    Returns a copy of the cached user with the given id, or None.
+
+    Every request gets its own instance, so changes a request makes to
+    request.user do not leak into concurrent requests.
+    """
+    user_cache_invalidator.ensure_listener()
+    user = user_cache.get(str(user_id))
+    return copy.copy(user) if user is not None else None
+
+
+def cache_user(user):
+    """
+    Stores a copy of an authenticated user in this process's cache.
+    """
+    user_cache.set(str(user.pk), copy.copy(user))
+
+
+def invalidate_user(user_id):
+    """
+    Drops a user from the cache of every process.
+
+    Processes that miss the message still drop the user after
+    USER_CACHE_TTL seconds.
+    """
+    user_cache_invalidator.invalidate(str(user_id))
@@ -1,8 +1,11 @@
 from django.contrib.auth import get_user_model
-from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.contrib.auth.models import update_last_login
+from rest_framework import exceptions, serializers
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 
 from users_app.api.signals import password_reset_requested
+from users_app.tokens import RefreshToken
 
 User = get_user_model()
 
@@ -61,6 +64,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     Serializer for user login.
     """
+    token_class = RefreshToken
     email = serializers.EmailField(write_only=True)
     password = serializers.CharField(write_only=True)
 
@@ -75,9 +79,12 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
     def validate(self, attrs):
         """
-        Validates the login credentials.
+        Validates the login credentials and issues the token pair.
         Checks for existing user.
         Checks for correct password.
+
+        The user is loaded with one query and the password hashed once;
+        the authenticated user is kept on self.user for the view.
         """
         email = attrs['email']
         password = attrs['password']
@@ -90,8 +97,22 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         if not user.check_password(password):
             raise serializers.ValidationError("Wrong password")
 
-        attrs['username'] = user.username
-        return super().validate(attrs)
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise exceptions.AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account")
+
+        self.user = user
+        refresh = self.get_token(user)
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+        return {"refresh": str(refresh), "access": str(refresh.access_token)}
+
+
+class CookieTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Serializer for token refresh, checking the Redis token blacklist.
+    """
+    token_class = RefreshToken
 
 
 class ResetPasswordSerializer(serializers.Serializer):
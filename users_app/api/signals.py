@@ -1,8 +1,10 @@
 import django_rq
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import Signal, receiver
 from django.contrib.auth import get_user_model
+from users_app.api.cache import invalidate_user
 from users_app.api.tasks import send_activation_email, send_password_reset_email
 
 
@@ -11,13 +13,28 @@ password_reset_requested = Signal()
 
 
 @receiver(post_save, sender=User)
-def user_post_save(sender, instance, created, **kwargs):
+def user_post_save(sender, instance, created, update_fields=None, **kwargs):
     """
     Handles the user post save signal.
+
+    Changed users (password, activation) are dropped from the
+    authentication cache of every process once the change is committed.
+    The last_login update on every login leaves the cache alone.
     """
     if created and not instance.is_active:
-        queue = django_rq.get_queue('default', autocommit=True)
+        queue = django_rq.get_queue('email', autocommit=True)
         queue.enqueue(send_activation_email, instance)
+    if not created and update_fields != frozenset({"last_login"}):
+        transaction.on_commit(lambda: invalidate_user(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def user_post_delete(sender, instance, **kwargs):
+    """
+    Drops a deleted user from the authentication cache of every process.
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
 
 
 @receiver(password_reset_requested)
@@ -25,5 +42,5 @@ def password_reset_requested_handler(sender, user, **kwargs):
     """
     Handles the password reset requested signal.
     """
-    queue = django_rq.get_queue('default', autocommit=True)
+    queue = django_rq.get_queue('email', autocommit=True)
     queue.enqueue(send_password_reset_email, user)
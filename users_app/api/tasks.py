@@ -1,8 +1,11 @@
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 
 from users_app.api.utils import generate_activation_link, generate_reset_password_link
+from users_app.tokens import blacklist_jti
 
 
 def send_activation_email(instance):
@@ -45,3 +48,27 @@ def send_password_reset_email(user):
         subject, text_content, from_email, [to_email])
     msg.attach_alternative(html_content, "text/html")
     msg.send(fail_silently=False)
+
+
+def purge_token_tables(batch_size=1000):
+    """
+    Empty the database token blacklist tables in batches.
+
+    Runs periodically (RQ_PERIODIC_JOBS). Tokens are blacklisted in Redis
+    now, so the rows only remain from before. Revoked tokens that have not
+    expired yet are copied to the Redis blacklist before their rows are
+    deleted; deleting an outstanding token cascades to its blacklist row.
+    Returns the number of deleted outstanding tokens.
+    """
+    deleted = 0
+    while True:
+        rows = list(OutstandingToken.objects.order_by("pk").values_list(
+            "pk", "jti", "expires_at", "blacklistedtoken")[:batch_size])
+        if not rows:
+            return deleted
+        now = timezone.now()
+        for _, jti, expires_at, blacklisted in rows:
+            if blacklisted and expires_at > now:
+                blacklist_jti(jti, expires_at.timestamp())
+        OutstandingToken.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        deleted += len(rows)
@@ -0,0 +1,82 @@
+import hashlib
+import time
+import uuid
+
+from django_redis import get_redis_connection
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class RedisSlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Rate throttle counting requests over a sliding window in Redis.
+
+    Every allowed request is a member of a sorted set scored by its time,
+    so the limit holds for any window of the rate's duration instead of
+    resetting at fixed boundaries. Rejected requests are not counted, and
+    all web processes share the counts.
+    """
+    cache_format = "videoflix:throttle:%(scope)s:%(ident)s"
+
+    def allow_request(self, request, view):
+        """
+        Records the request and returns whether it is within the rate.
+        """
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = time.time()
+        member = uuid.uuid4().hex
+        redis = get_redis_connection("default")
+        with redis.pipeline() as pipe:
+            pipe.zremrangebyscore(self.key, 0, self.now - self.duration)
+            pipe.zadd(self.key, {member: self.now})
+            pipe.zcard(self.key)
+            pipe.zrange(self.key, 0, 0, withscores=True)
+            pipe.expire(self.key, self.duration)
+            _, _, count, oldest, _ = pipe.execute()
+        if count <= self.num_requests:
+            return True
+        redis.zrem(self.key, member)
+        self.oldest = oldest[0][1] if oldest else self.now
+        return False
+
+    def wait(self):
+        """
+        Returns the seconds until the oldest counted request leaves the
+        window.
+        """
+        return max(self.oldest + self.duration - self.now, 0)
+
+
+class LoginIPRateThrottle(RedisSlidingWindowThrottle):
+    """
+    Limits login attempts per client IP address.
+    """
+    scope = "login_ip"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
+
+
+class LoginEmailRateThrottle(RedisSlidingWindowThrottle):
+    """
+    Limits login attempts per account email, whatever IP they come from.
+    """
+    scope = "login_email"
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, dict):
+            return None
+        email = request.data.get("email")
+        if not isinstance(email, str) or not email:
+            return None
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": hashlib.sha256(email.strip().lower().encode()).hexdigest(),
+        }
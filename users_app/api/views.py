@@ -5,10 +5,11 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenBlacklistView
 
 from users_app.api import serializers
+from users_app.api.throttling import LoginEmailRateThrottle, LoginIPRateThrottle
+from users_app.tokens import RefreshToken
 
 User = get_user_model()
 
@@ -64,17 +65,21 @@ class CookieTokenObtainPairView(TokenObtainPairView):
     """
     serializer_class = serializers.CustomTokenObtainPairSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPRateThrottle, LoginEmailRateThrottle]
 
     def post(self, request, *args, **kwargs):
         """
         Generates a new access and refresh token for the user.
         Sets the tokens as HttpOnly cookies in the response.
+
+        Attempts are throttled per IP and per email before the password
+        is hashed.
         """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         refresh = serializer.validated_data["refresh"]
         access = serializer.validated_data["access"]
-        user = User.objects.get(email=request.data['email'])
+        user = serializer.user
         response = Response({
             "detail": "Login successful",
             "user": {
@@ -103,6 +108,7 @@ class CookieTokenRefreshView(TokenRefreshView):
     """
     Handles token refresh for user login.
     """
+    serializer_class = serializers.CookieTokenRefreshSerializer
 
     def post(self, request, *args, **kwargs):
         """
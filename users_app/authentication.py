@@ -1,9 +1,21 @@
+from asgiref.sync import sync_to_async
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from users_app.api.cache import cache_user, get_cached_user
 
 
 class CookieJWTAuthentication(JWTAuthentication):
     """
     Custom authentication class to authenticate users via JWT stored in cookies.
+
+    Users are kept in a small per-process cache, so playlist and segment
+    requests do not query the user table. Saving a user drops it from the
+    cache of every process.
     """
 
     def authenticate(self, request):
@@ -19,3 +31,53 @@ class CookieJWTAuthentication(JWTAuthentication):
 
         validated_token = self.get_validated_token(cookie_token)
         return self.get_user(validated_token), validated_token
+
+    async def aauthenticate(self, request):
+        """
+        Async variant of authenticate() for views running on the event loop.
+
+        Token validation is pure CPU work; only the user lookup touches the
+        database and runs in the sync thread.
+        """
+        cookie_token = request.COOKIES.get("access_token")
+        if not cookie_token:
+            return None
+
+        validated_token = self.get_validated_token(cookie_token)
+        user = self.get_cached_user(validated_token)
+        if user is None:
+            user = await sync_to_async(self.get_user)(validated_token)
+        return user, validated_token
+
+    def get_user(self, validated_token):
+        """
+        Returns the user of the token from the process cache or the database.
+        """
+        user = self.get_cached_user(validated_token)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache_user(user)
+        return user
+
+    def get_cached_user(self, validated_token):
+        """
+        Returns the cached user of the token, or None on a cache miss.
+
+        The cached user passes the same checks as one loaded by get_user().
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")) from e
+
+        user = get_cached_user(user_id)
+        if user is None:
+            return None
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed")
+        return user
@@ -1,3 +1,120 @@
+import hashlib
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django_redis import get_redis_connection
+from rest_framework.test import APIClient
+from rest_framework_simplejwt import tokens as simplejwt_tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken, OutstandingToken)
+
+from users_app import tokens
+from users_app.api.tasks import purge_token_tables
+from users_app.api.throttling import RedisSlidingWindowThrottle
+from users_app.tokens import RefreshToken
+
+
+class TokenBlacklistTests(TestCase):
+    """
+    Tests for revoking refresh tokens in Redis.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "alice", "alice@example.com", "password")
+        self.redis = get_redis_connection("default")
+        patcher = mock.patch.object(tokens, "_db_blacklist_empty", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def forget(self, token):
+        """
+        Drops the token's blacklist entry once the test is done.
+        """
+        self.addCleanup(self.redis.delete, tokens._blacklist_key(token["jti"]))
+
+    def refresh(self, client):
+        return client.post(reverse("token_refresh"))
+
+    def test_logout_revokes_the_refresh_token(self):
+        client = APIClient()
+        response = client.post(reverse("token_obtain_pair"), {
+            "email": "alice@example.com", "password": "password"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        token = RefreshToken(response.cookies["refresh_token"].value)
+        self.forget(token)
+        self.assertEqual(self.refresh(client).status_code, 200)
+
+        client.post(reverse("token_blacklist"))
+        client.cookies["refresh_token"] = str(token)
+        self.assertEqual(self.refresh(client).status_code, 401)
+        self.assertFalse(OutstandingToken.objects.exists())
+
+    def test_token_stays_rejected_after_the_blacklist_entry_expires(self):
+        token = RefreshToken.for_user(self.user)
+        self.forget(token)
+        token.blacklist()
+        key = tokens._blacklist_key(token["jti"])
+        self.assertLessEqual(self.redis.ttl(key), token["exp"] - time.time())
+
+        self.redis.delete(key)
+        after_expiry = timezone.now() + timedelta(seconds=token["exp"] - time.time() + 1)
+        with mock.patch.object(simplejwt_tokens, "aware_utcnow", return_value=after_expiry):
+            with self.assertRaises(TokenError):
+                RefreshToken(str(token))
+
+    def test_token_revoked_in_the_database_stays_rejected(self):
+        token = RefreshToken.for_user(self.user)
+        self.forget(token)
+        outstanding = OutstandingToken.objects.create(
+            user=self.user, jti=token["jti"], token=str(token),
+            expires_at=timezone.now() + timedelta(days=1))
+        BlacklistedToken.objects.create(token=outstanding)
+        with self.assertRaises(TokenError):
+            RefreshToken(str(token))
+
+        purge_token_tables()
+        self.assertFalse(OutstandingToken.objects.exists())
+        with self.assertRaises(TokenError):
+            RefreshToken(str(token))
+
+
+@mock.patch.object(RedisSlidingWindowThrottle, "THROTTLE_RATES",
+                   {"login_ip": "100/min", "login_email": "2/min"})
+class LoginThrottleTests(TestCase):
+    """
+    Tests for throttling login attempts in Redis.
+    """
+    email = "bob@example.com"
+
+    def setUp(self):
+        User.objects.create_user("bob", self.email, "password")
+        redis = get_redis_connection("default")
+        keys = [
+            "videoflix:throttle:login_ip:127.0.0.1",
+            "videoflix:throttle:login_email:"
+            + hashlib.sha256(self.email.encode()).hexdigest(),
+        ]
+        redis.delete(*keys)
+        self.addCleanup(redis.delete, *keys)
+
+    def login(self, password):
+        return APIClient().post(reverse("token_obtain_pair"), {
+            "email": self.email, "password": password}, format="json")
 
-# Create your tests here.
+    def test_throttle_answers_before_the_password_is_checked(self):
+        with mock.patch.object(User, "check_password", autospec=True,
+                               return_value=False) as check_password:
+            for _ in range(2):
+                self.assertEqual(self.login("wrong").status_code, 400)
+            response = self.login("password")
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+        self.assertEqual(check_password.call_count, 2)
+        self.assertNotIn("refresh_token", response.cookies)
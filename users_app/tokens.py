@@ -0,0 +1,98 @@
+import time
+
+from django.utils.translation import gettext_lazy as _
+from django_redis import get_redis_connection
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+
+# Set once this process has seen the database blacklist emptied by
+# purge_token_tables; rows are never added to it again.
+_db_blacklist_empty = False
+
+
+def _blacklist_key(jti):
+    """
+    Returns the Redis key marking the token with the given jti as revoked.
+    """
+    return f"videoflix:token-blacklist:{jti}"
+
+
+def blacklist_jti(jti, expires_at):
+    """
+    Revokes a token until it expires; expired tokens are rejected anyway.
+
+    expires_at is the token's "exp" claim as a Unix timestamp.
+    """
+    ttl = int(expires_at - time.time())
+    if ttl > 0:
+        get_redis_connection("default").set(_blacklist_key(jti), 1, ex=ttl)
+
+
+def is_blacklisted(jti):
+    """
+    Returns whether the token with the given jti has been revoked.
+    """
+    return bool(get_redis_connection("default").exists(_blacklist_key(jti)))
+
+
+def is_blacklisted_in_db(jti):
+    """
+    Returns whether the token was revoked in the old database blacklist.
+
+    Tokens revoked before the blacklist moved to Redis stay revoked until
+    purge_token_tables has copied them over and emptied the table.
+    """
+    global _db_blacklist_empty
+    if _db_blacklist_empty:
+        return False
+    if BlacklistedToken.objects.filter(token__jti=jti).exists():
+        return True
+    _db_blacklist_empty = not BlacklistedToken.objects.exists()
+    return False
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    Refresh token whose blacklist lives in Redis instead of the database.
+
+    Issuing and refreshing tokens writes nothing; logout stores the jti
+    with a TTL up to the token's expiry, so the blacklist never grows
+    beyond the tokens that are still valid.
+    """
+
+    def verify(self, *args, **kwargs):
+        """
+        Checks the Redis blacklist, then the signature and claims.
+        """
+        self.check_blacklist()
+        super(tokens.BlacklistMixin, self).verify(*args, **kwargs)
+
+    def check_blacklist(self):
+        """
+        Raises TokenError if this token has been revoked.
+        """
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if is_blacklisted(jti) or is_blacklisted_in_db(jti):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        """
+        Revokes this token.
+        """
+        blacklist_jti(self.payload[api_settings.JTI_CLAIM], self.payload["exp"])
+
+    def outstand(self):
+        """
+        Issued tokens are not recorded; see the class docstring.
+        """
+        return None
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        Creates a token for user without an OutstandingToken row.
+        """
+        return super(tokens.BlacklistMixin, cls).for_user(user)
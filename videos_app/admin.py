@@ -1,10 +1,33 @@
 from django.contrib import admin
 
-from videos_app.models import Video
+from videos_app.models import Video, VideoStats, VideoUpload, WatchProgress
 
 
 class VideoAdmin(admin.ModelAdmin):
-    list_display = ['id', 'title', 'category', 'created_at']
+    list_display = ['id', 'title', 'category', 'status', 'created_at']
+    list_filter = ['status']
 
 
 admin.site.register(Video, VideoAdmin)
+
+
+class VideoUploadAdmin(admin.ModelAdmin):
+    list_display = ['uuid', 'filename', 'offset', 'size', 'video', 'updated_at']
+
+
+admin.site.register(VideoUpload, VideoUploadAdmin)
+
+
+class WatchProgressAdmin(admin.ModelAdmin):
+    list_display = ['user', 'video', 'position', 'duration', 'updated_at']
+
+
+admin.site.register(WatchProgress, WatchProgressAdmin)
+
+
+class VideoStatsAdmin(admin.ModelAdmin):
+    list_display = ['video', 'play_count', 'unique_viewers', 'updated_at']
+    ordering = ['-play_count']
+
+
+admin.site.register(VideoStats, VideoStatsAdmin)
@@ -0,0 +1,166 @@
+import os
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from users_app.authentication import CookieJWTAuthentication
+from videos_app.api.cache import aget_master_body, aget_playlist_body, aget_video_uuid, segment_cache
+from videos_app.api.play_stats import record_play
+from videos_app.api.signing import sign_playlist, sign_video, signed_expiry, verify_video_signature
+from videos_app.api.utils import afile_response, playlist_response
+from videos_app.api.views import SEGMENT_CONTENT_TYPES, rewrite_master_playlist
+
+
+class AsyncDeliveryView(View):
+    """
+    Base class of the async HLS delivery views used under ASGI.
+
+    DRF views are synchronous, so these plain Django views authenticate
+    themselves and answer errors with the same {"detail": ...} bodies as
+    the DRF views. Like DEFAULT_AUTHENTICATION_CLASSES they accept the JWT
+    cookie first, then a Django session (e.g. a logged-in admin).
+    """
+    http_method_names = ["get", "head", "options"]
+    authenticate = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        Authenticates the request, then runs the handler and maps its errors.
+        """
+        try:
+            if self.authenticate:
+                user = await self.authenticate_user(request)
+                if user is None:
+                    return self.error("Authentication credentials were not provided.",
+                                      status.HTTP_401_UNAUTHORIZED)
+                request.user = user
+            return await super().dispatch(request, *args, **kwargs)
+        except AuthenticationFailed as exc:
+            return self.error(exc.detail, status.HTTP_401_UNAUTHORIZED)
+        except Http404 as exc:
+            return self.error(str(exc) or "Not found.", status.HTTP_404_NOT_FOUND)
+
+    async def authenticate_user(self, request):
+        """
+        Returns the user of the JWT cookie or of the session, or None.
+
+        Session users must be active, as with DRF's SessionAuthentication.
+        Only safe methods are served, so no CSRF check is needed.
+        """
+        result = await CookieJWTAuthentication().aauthenticate(request)
+        if result is not None:
+            return result[0]
+        user = await request.auser()
+        if user.is_authenticated and user.is_active:
+            return user
+        return None
+
+    def error(self, detail, status_code):
+        """
+        Builds a JSON error response like the ones of DRF.
+        """
+        return JsonResponse({"detail": detail}, status=status_code)
+
+
+async def _segment_response(request, video_uuid, resolution, segment, cache_control):
+    """
+    Streams a segment file of a video asynchronously.
+    """
+    try:
+        segment_path = safe_join(
+            settings.MEDIA_ROOT, 'videos', str(video_uuid), resolution, segment)
+    except SuspiciousFileOperation:
+        raise Http404("Segment not found")
+
+    content_type = SEGMENT_CONTENT_TYPES.get(
+        os.path.splitext(segment)[1], 'application/octet-stream')
+    return await afile_response(request, segment_path, content_type,
+                                cache_control, cache=segment_cache)
+
+
+class HLSMasterPlaylistView(AsyncDeliveryView):
+    """
+    Async variant of views.HLSMasterPlaylistView.
+    """
+
+    async def get(self, request, movie_id):
+        """
+        Retrieve the master playlist of a video.
+        """
+        video_uuid = await aget_video_uuid(movie_id)
+        if video_uuid is None:
+            raise Http404("Video not found")
+        body = await aget_master_body(video_uuid)
+        if body is None:
+            raise Http404("Playlist not found")
+        await sync_to_async(record_play)(movie_id, request.user.pk)
+        return playlist_response(request, rewrite_master_playlist(body, movie_id),
+                                 settings.VIDEO_PLAYLIST_CACHE_CONTROL)
+
+
+class HLSPlaylistView(AsyncDeliveryView):
+    """
+    Async variant of views.HLSPlaylistView.
+    """
+
+    async def get(self, request, movie_id, resolution):
+        """
+        Retrieve the signed HLS playlist for a specific video and resolution.
+        """
+        video_uuid = await aget_video_uuid(movie_id)
+        if video_uuid is None:
+            raise Http404("Video not found")
+        body = await aget_playlist_body(video_uuid, resolution)
+        if body is None:
+            raise Http404("Playlist not found")
+
+        expires = signed_expiry()
+        prefix = reverse("hls-signed-segment", kwargs={
+            "video_uuid": video_uuid,
+            "expires": expires,
+            "signature": sign_video(video_uuid, expires),
+            "resolution": resolution,
+            "segment": "_"
+        })[:-1]
+        return playlist_response(request, sign_playlist(body, prefix),
+                                 settings.VIDEO_PLAYLIST_CACHE_CONTROL)
+
+
+class HLSSegmentView(AsyncDeliveryView):
+    """
+    Async variant of views.HLSSegmentView.
+    """
+
+    async def get(self, request, movie_id, resolution, segment):
+        """
+        Stream a specific HLS segment for a video.
+        """
+        video_uuid = await aget_video_uuid(movie_id)
+        if video_uuid is None:
+            raise Http404("Video not found")
+        return await _segment_response(request, video_uuid, resolution, segment,
+                                       settings.VIDEO_SEGMENT_CACHE_CONTROL)
+
+
+class SignedSegmentView(AsyncDeliveryView):
+    """
+    Async variant of views.SignedSegmentView.
+    """
+    authenticate = False
+
+    async def get(self, request, video_uuid, expires, signature, resolution, segment):
+        """
+        Stream a segment if its URL signature is valid and not expired.
+        """
+        if not verify_video_signature(video_uuid, expires, signature):
+            return self.error("Invalid or expired segment URL.",
+                              status.HTTP_403_FORBIDDEN)
+        return await _segment_response(request, video_uuid, resolution, segment,
+                                       settings.VIDEO_SIGNED_SEGMENT_CACHE_CONTROL)
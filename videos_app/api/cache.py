@@ -0,0 +1,225 @@
+import hashlib
+import os
+import re
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.utils._os import safe_join
+
+from core.cache import ByteLRUCache, CacheInvalidator, LRUCache
+from videos_app.models import Video
+
+
+local_cache = LRUCache(maxsize=settings.VIDEO_LOCAL_CACHE_SIZE,
+                       ttl=settings.VIDEO_LOCAL_CACHE_TTL)
+
+local_cache_invalidator = CacheInvalidator(
+    "videoflix:video-cache-invalidation", local_cache)
+
+segment_cache = ByteLRUCache(
+    max_bytes=settings.VIDEO_SEGMENT_CACHE_BYTES,
+    max_entry_bytes=settings.VIDEO_SEGMENT_CACHE_MAX_ENTRY_BYTES)
+
+
+def _cached(key, loader):
+    """
+    Looks a value up in the process cache, then Redis, then the loader.
+
+    Loader results of None (missing video, playlist not written yet) are
+    not cached, so videos become available as soon as transcoding ends.
+    """
+    value = _local_get(key)
+    if value is not None:
+        return value
+
+    value = cache.get(key)
+    if value is None:
+        value = loader()
+        if value is None:
+            return None
+        cache.set(key, value, settings.VIDEO_CACHE_TIMEOUT)
+    local_cache.set(key, value)
+    return value
+
+
+def _local_get(key):
+    """
+    Looks a value up in the process cache, listening for invalidations.
+    """
+    local_cache_invalidator.ensure_listener()
+    return local_cache.get(key)
+
+
+def _uuid_key(video_id):
+    return f"video-uuid:{video_id}"
+
+
+def _renditions_key(video_uuid):
+    return f"video-renditions:{video_uuid}"
+
+
+def _playlist_key(video_uuid, resolution):
+    return f"video-playlist:{video_uuid}:{resolution}"
+
+
+def _master_key(video_uuid):
+    return f"video-master:{video_uuid}"
+
+
+def _catalog_key(version, variant):
+    return f"video-catalog:{version}:{variant}"
+
+
+def get_video_uuid(video_id):
+    """
+    Returns the storage uuid of a video id, or None if it does not exist.
+    """
+    return _cached(_uuid_key(video_id), lambda: Video.objects.filter(
+        pk=video_id).values_list("uuid", flat=True).first())
+
+
+def _list_renditions(video_uuid):
+    """
+    Returns the rendition folder names of a video, lowest resolution first.
+    """
+    video_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(video_uuid))
+    if not os.path.isdir(video_dir):
+        return []
+    return sorted((name for name in os.listdir(video_dir)
+                   if re.fullmatch(r"\d+p", name)),
+                  key=lambda name: int(name[:-1]))
+
+
+def get_renditions(video_uuid):
+    """
+    Returns the rendition names of a fully transcoded video, else None.
+    """
+    def load():
+        master_path = os.path.join(
+            settings.MEDIA_ROOT, "videos", str(video_uuid), "master.m3u8")
+        if not os.path.exists(master_path):
+            return None
+        return _list_renditions(video_uuid)
+
+    return _cached(_renditions_key(video_uuid), load)
+
+
+def _read_playlist(video_uuid, *path):
+    """
+    Reads a playlist below the video folder, or returns None if it does not
+    exist.
+    """
+    try:
+        with open(safe_join(settings.MEDIA_ROOT, "videos", str(video_uuid),
+                            *path)) as f:
+            return f.read()
+    except (SuspiciousFileOperation, FileNotFoundError):
+        return None
+
+
+def get_playlist_body(video_uuid, resolution):
+    """
+    Returns the media playlist of a rendition, or None if it does not exist.
+
+    Playlists are only cached once the video is fully transcoded, and
+    unknown resolutions are then rejected from the cached rendition list
+    without touching the file system.
+    """
+    renditions = get_renditions(video_uuid)
+    if renditions is None:
+        return _read_playlist(video_uuid, resolution, "index.m3u8")
+    if resolution not in renditions:
+        return None
+    return _cached(_playlist_key(video_uuid, resolution),
+                   lambda: _read_playlist(video_uuid, resolution, "index.m3u8"))
+
+
+def get_master_body(video_uuid):
+    """
+    Returns the master playlist of a fully transcoded video, else None.
+    """
+    if get_renditions(video_uuid) is None:
+        return None
+    return _cached(_master_key(video_uuid),
+                   lambda: _read_playlist(video_uuid, "master.m3u8"))
+
+
+async def aget_video_uuid(video_id):
+    """
+    Async variant of get_video_uuid() that answers process cache hits inline.
+    """
+    value = _local_get(_uuid_key(video_id))
+    if value is None:
+        value = await sync_to_async(get_video_uuid)(video_id)
+    return value
+
+
+async def aget_master_body(video_uuid):
+    """
+    Async variant of get_master_body() that answers process cache hits inline.
+    """
+    value = _local_get(_master_key(video_uuid))
+    if value is None:
+        value = await sync_to_async(get_master_body)(video_uuid)
+    return value
+
+
+async def aget_playlist_body(video_uuid, resolution):
+    """
+    Async variant of get_playlist_body() that answers process cache hits inline.
+    """
+    value = _local_get(_playlist_key(video_uuid, resolution))
+    if value is None:
+        value = await sync_to_async(get_playlist_body)(video_uuid, resolution)
+    return value
+
+
+def catalog_version():
+    """
+    Returns the current version of the cached catalog pages.
+    """
+    return cache.get_or_set("video-catalog-version", time.time_ns(), None)
+
+
+def bump_catalog_version():
+    """
+    Makes every cached catalog page stale after any video change.
+
+    Old pages are not deleted; they are no longer looked up and expire
+    after VIDEO_CATALOG_CACHE_TIMEOUT. Inside a transaction the version is
+    only bumped once it commits; bumping earlier would let a concurrent
+    request cache the uncommitted state under the new version.
+    """
+    transaction.on_commit(lambda: cache.set(
+        "video-catalog-version", time.time_ns(), None))
+
+
+def catalog_cache_key(request):
+    """
+    Returns the key of a catalog page for the current catalog version.
+
+    The host is part of the key because page links are absolute URLs.
+    """
+    variant = hashlib.md5(
+        f"{request.get_host()}?{sorted(request.query_params.lists())}".encode(),
+        usedforsecurity=False).hexdigest()
+    return _catalog_key(catalog_version(), variant)
+
+
+def invalidate_video(video_id, video_uuid):
+    """
+    Drops every cached value of a video from Redis and every process.
+
+    Other processes are told over Redis pub/sub; one that misses the
+    message drops its copies after VIDEO_LOCAL_CACHE_TTL seconds.
+    """
+    keys = [_uuid_key(video_id), _renditions_key(video_uuid),
+            _master_key(video_uuid)]
+    keys += [_playlist_key(video_uuid, rendition)
+             for rendition in _list_renditions(video_uuid)]
+    cache.delete_many(keys)
+    local_cache_invalidator.invalidate(*keys)
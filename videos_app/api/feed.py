@@ -0,0 +1,134 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from videos_app.api.serializers import VideoSerializer
+from videos_app.models import Video
+
+
+HOME_FEED_KEY = "home-feed"
+HOME_FEED_VERSION_KEY = "home-feed-version"
+
+
+def home_feed_videos(limit):
+    """
+    Returns the limit newest ready videos of every category in one query.
+
+    Videos are ranked within their category by a ROW_NUMBER() window and
+    come back ordered by category and rank.
+    """
+    return Video.objects.defer("search_vector").filter(
+        status=Video.Status.READY
+    ).annotate(
+        rank=Window(
+            RowNumber(),
+            partition_by=F("category"),
+            order_by=(F("created_at").desc(), F("id").desc()),
+        )
+    ).filter(rank__lte=limit).order_by("category", "rank")
+
+
+def build_home_feed():
+    """
+    Returns the home feed rows, the category with the newest video first.
+    """
+    rows = {}
+    for video in home_feed_videos(settings.VIDEO_HOME_FEED_LIMIT):
+        rows.setdefault(video.category, []).append(video)
+    ordered = sorted(rows.items(), key=lambda row: row[1][0].created_at,
+                     reverse=True)
+    return [
+        {"category": category,
+         "videos": VideoSerializer(videos, many=True).data}
+        for category, videos in ordered
+    ]
+
+
+def rebuild_home_feed():
+    """
+    Serialize the home feed into a new versioned snapshot in Redis.
+
+    The snapshot does not expire; it is replaced whenever a video becomes
+    ready, is edited or is deleted. Its URLs are relative, since the jobs
+    rebuilding it have no request; render_home_feed makes them absolute.
+    Its version is also stored under a key of its own, so requests can find
+    the rendered body without loading the snapshot.
+    """
+    snapshot = {"version": time.time_ns(), "categories": build_home_feed()}
+    cache.set_many({HOME_FEED_KEY: snapshot,
+                    HOME_FEED_VERSION_KEY: snapshot["version"]}, None)
+    return snapshot
+
+
+def get_home_feed():
+    """
+    Returns the current home feed snapshot, building it if none exists yet.
+    """
+    snapshot = cache.get(HOME_FEED_KEY)
+    if snapshot is None:
+        snapshot = rebuild_home_feed()
+    return snapshot
+
+
+def _absolute_video(video, request):
+    """
+    Returns serialized video data with the URLs VideoSerializer builds
+    from the request, as in the catalog listing.
+    """
+    video = dict(video)
+    for field in ("thumbnail_url", "trickplay_url"):
+        if video[field]:
+            video[field] = request.build_absolute_uri(video[field])
+    video["thumbnails"] = {
+        extension: {width: request.build_absolute_uri(url)
+                    for width, url in variants.items()}
+        for extension, variants in video["thumbnails"].items()
+    }
+    return video
+
+
+def _home_feed_body_key(version, request):
+    """
+    Returns the cache key of the rendered home feed of a snapshot version
+    for the scheme and host of request.
+    """
+    return f"home-feed-body:{version}:{request.build_absolute_uri('/')}"
+
+
+def render_home_feed(request):
+    """
+    Returns the JSON body and ETag of the current home feed for the
+    scheme and host of request.
+
+    The body is rendered once per snapshot version and site and cached.
+    Serving the feed then reads the small version key and the body; the
+    snapshot itself is only loaded to render a new body.
+    """
+    version = cache.get(HOME_FEED_VERSION_KEY)
+    if version is not None:
+        rendered = cache.get(_home_feed_body_key(version, request))
+        if rendered is not None:
+            return rendered
+
+    snapshot = get_home_feed()
+    body = json.dumps({
+        "version": snapshot["version"],
+        "categories": [
+            {"category": row["category"],
+             "videos": [_absolute_video(video, request)
+                        for video in row["videos"]]}
+            for row in snapshot["categories"]
+        ],
+    }, default=str)
+    rendered = {
+        "etag": f'"{hashlib.md5(body.encode(), usedforsecurity=False).hexdigest()}"',
+        "body": body,
+    }
+    cache.set(_home_feed_body_key(snapshot["version"], request), rendered,
+              settings.VIDEO_CATALOG_CACHE_TIMEOUT)
+    return rendered
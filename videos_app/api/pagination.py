@@ -0,0 +1,25 @@
+from rest_framework.pagination import CursorPagination
+
+
+class VideoCursorPagination(CursorPagination):
+    """
+    Keyset pagination over videos, newest first.
+
+    Pages are located by an opaque cursor on (created_at, id) instead of an
+    offset, so every page costs one indexed query regardless of its
+    position in the catalog and no COUNT is run.
+    """
+    ordering = ("-created_at", "-id")
+    page_size = 24
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class SearchCursorPagination(VideoCursorPagination):
+    """
+    Keyset pagination over search results, most relevant first.
+
+    The integer relevance score is the cursor position; ties are broken
+    by id.
+    """
+    ordering = ("-score", "-id")
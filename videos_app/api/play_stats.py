@@ -0,0 +1,129 @@
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+
+PLAYS_KEY = "videoflix:plays"
+PLAYS_ROLLUP_KEY = "videoflix:plays:rollup"
+
+
+def _viewers_key(video_id):
+    """
+    Returns the HyperLogLog key counting the unique viewers of a video.
+    """
+    return f"videoflix:viewers:{video_id}"
+
+
+def _trending_key(epoch):
+    """
+    Returns the trending sorted set whose scores are relative to epoch.
+    """
+    return f"videoflix:trending:{epoch}"
+
+
+def _trending_window():
+    """
+    Returns the seconds after which scores move to a new landmark.
+
+    Within a window play weights grow by at most 2**16, far from the
+    float limit.
+    """
+    return settings.VIDEO_TRENDING_HALF_LIFE * 16
+
+
+def _play_weight(now, epoch):
+    """
+    Returns the forward-decayed weight of a play at now relative to the
+    start of epoch.
+    """
+    landmark = epoch * _trending_window()
+    return 2 ** ((now - landmark) / settings.VIDEO_TRENDING_HALF_LIFE)
+
+
+def record_play(video_id, user_id):
+    """
+    Count a play of a video in Redis with a single round trip.
+
+    Adds the play to the pending play counts, the viewer to the video's
+    HyperLogLog and the forward-decayed play weight to the trending sets
+    of the current and the next window. The next window's set therefore
+    already holds the recent plays when it takes over, and every set
+    expires once its window has passed.
+    """
+    now = time.time()
+    window = _trending_window()
+    epoch = int(now // window)
+    redis = get_redis_connection("default")
+    with redis.pipeline() as pipe:
+        pipe.hincrby(PLAYS_KEY, video_id, 1)
+        pipe.pfadd(_viewers_key(video_id), user_id)
+        for offset in (0, 1):
+            key = _trending_key(epoch + offset)
+            pipe.zincrby(key, _play_weight(now, epoch + offset), video_id)
+            pipe.expireat(key, int((epoch + offset + 1) * window))
+        pipe.execute()
+
+
+def trending_video_ids(count):
+    """
+    Returns up to count video ids, the highest trending score first.
+
+    Comparing forward-decayed scores is the same as comparing scores that
+    decay over time, since all share the landmark of the window.
+    """
+    epoch = int(time.time() // _trending_window())
+    return [int(video_id) for video_id in get_redis_connection("default").zrevrange(
+        _trending_key(epoch), 0, count - 1)]
+
+
+def pop_play_counts():
+    """
+    Moves the pending play counts aside and returns them.
+
+    Returns {video_id: plays}. Counts left over from a failed rollup are
+    returned first; call clear_play_counts once they are stored.
+    """
+    redis = get_redis_connection("default")
+    if not redis.exists(PLAYS_ROLLUP_KEY):
+        try:
+            redis.rename(PLAYS_KEY, PLAYS_ROLLUP_KEY)
+        except ResponseError:
+            # No plays since the last rollup.
+            return {}
+    return {int(video_id): int(plays)
+            for video_id, plays in redis.hgetall(PLAYS_ROLLUP_KEY).items()}
+
+
+def clear_play_counts():
+    """
+    Drops the play counts returned by pop_play_counts after a rollup.
+    """
+    get_redis_connection("default").delete(PLAYS_ROLLUP_KEY)
+
+
+def count_unique_viewers(video_ids):
+    """
+    Returns {video_id: estimated unique viewers} of the given videos.
+    """
+    redis = get_redis_connection("default")
+    with redis.pipeline() as pipe:
+        for video_id in video_ids:
+            pipe.pfcount(_viewers_key(video_id))
+        counts = pipe.execute()
+    return dict(zip(video_ids, counts))
+
+
+def clear_play_stats(video_id):
+    """
+    Removes a deleted video from the trending sets and drops its viewers.
+    """
+    epoch = int(time.time() // _trending_window())
+    redis = get_redis_connection("default")
+    with redis.pipeline() as pipe:
+        pipe.delete(_viewers_key(video_id))
+        pipe.hdel(PLAYS_KEY, video_id)
+        pipe.zrem(_trending_key(epoch), video_id)
+        pipe.zrem(_trending_key(epoch + 1), video_id)
+        pipe.execute()
@@ -0,0 +1,99 @@
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+
+def _progress_key(video_id):
+    """
+    Returns the Redis hash key holding the transcoding progress of a video.
+    """
+    return f"videoflix:video-progress:{video_id}"
+
+
+def start_progress(video_id, resolutions, duration):
+    """
+    Reset the progress of a video before its renditions are encoded.
+    """
+    key = _progress_key(video_id)
+    redis = get_redis_connection("default")
+    with redis.pipeline() as pipe:
+        pipe.delete(key)
+        pipe.hset(key, mapping={
+            "duration": duration,
+            **{f"{resolution}p": 0 for resolution in resolutions},
+        })
+        pipe.expire(key, settings.VIDEO_PROGRESS_TTL)
+        pipe.execute()
+
+
+def add_progress(video_id, resolutions, seconds):
+    """
+    Add encoded seconds to every rendition of a video.
+
+    Chunk jobs of the same video report into the same hash, so the stored
+    value is the total encoded duration across all chunks.
+    """
+    key = _progress_key(video_id)
+    redis = get_redis_connection("default")
+    with redis.pipeline() as pipe:
+        for resolution in resolutions:
+            pipe.hincrbyfloat(key, f"{resolution}p", seconds)
+        pipe.expire(key, settings.VIDEO_PROGRESS_TTL)
+        pipe.execute()
+
+
+def get_progress(video_id):
+    """
+    Returns the encoded percentage of every rendition of a video.
+    """
+    values = get_redis_connection("default").hgetall(_progress_key(video_id))
+    duration = float(values.pop(b"duration", 0))
+    if not duration:
+        return {}
+    return {
+        rendition.decode(): min(100.0, round(float(seconds) * 100 / duration, 1))
+        for rendition, seconds in values.items()
+    }
+
+
+def clear_progress(video_id):
+    """
+    Remove the stored progress once a video is ready or deleted.
+    """
+    get_redis_connection("default").delete(_progress_key(video_id))
+
+
+class ProgressReporter:
+    """
+    Turns ffmpeg -progress output into throttled Redis progress updates.
+    """
+
+    def __init__(self, video_id, resolutions):
+        self.video_id = video_id
+        self.resolutions = resolutions
+        self.encoded = 0.0
+        self.reported = 0.0
+        self.last_report = time.monotonic()
+
+    def feed(self, line):
+        """
+        Parse one key=value line written by ffmpeg -progress.
+        """
+        key, _, value = line.strip().partition("=")
+        if key == "out_time_us" and value.isdigit():
+            self.encoded = int(value) / 1_000_000
+        if key == "progress":
+            interval = settings.VIDEO_PROGRESS_INTERVAL
+            if value == "end" or time.monotonic() - self.last_report >= interval:
+                self.flush()
+
+    def flush(self):
+        """
+        Write the seconds encoded since the last report to Redis.
+        """
+        if self.encoded > self.reported:
+            add_progress(self.video_id, self.resolutions,
+                         self.encoded - self.reported)
+            self.reported = self.encoded
+        self.last_report = time.monotonic()
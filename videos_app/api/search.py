@@ -0,0 +1,65 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db.models import BigIntegerField, F, Q
+from django.db.models.functions import Cast, Coalesce, Round
+
+from videos_app.models import Video
+
+
+def video_search_vector():
+    """
+    Returns the weighted search vector expression stored on every video.
+
+    Title matches rank above category matches, which rank above matches in
+    the description.
+    """
+    config = settings.VIDEO_SEARCH_CONFIG
+    return (SearchVector("title", weight="A", config=config)
+            + SearchVector("category", weight="B", config=config)
+            + SearchVector("description", weight="C", config=config))
+
+
+def update_search_vector(*video_ids):
+    """
+    Recomputes the stored search vector of the given videos, or of all.
+    """
+    queryset = Video.objects.all()
+    if video_ids:
+        queryset = queryset.filter(pk__in=video_ids)
+    queryset.update(search_vector=video_search_vector())
+
+
+def prefix_query(text):
+    """
+    Builds a tsquery matching every word of text as a prefix, or None.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return SearchQuery(" & ".join(f"{word}:*" for word in words),
+                       search_type="raw", config=settings.VIDEO_SEARCH_CONFIG)
+
+
+def search_videos(text):
+    """
+    Returns the ready videos matching text, with an integer relevance score.
+
+    A video matches if every word prefixes a word of its stored search
+    vector, or if its title is trigram-similar to text, which tolerates
+    typos. Both conditions are served by GIN indexes. The score adds the
+    full-text rank and the trigram word similarity, scaled to an integer
+    so cursor positions compare exactly.
+    """
+    query = prefix_query(text)
+    if query is None:
+        return Video.objects.none()
+    return Video.objects.defer("search_vector").filter(
+        status=Video.Status.READY
+    ).filter(
+        Q(search_vector=query) | Q(title__trigram_word_similar=text)
+    ).annotate(score=Cast(Round(
+        (Coalesce(SearchRank(F("search_vector"), query), 0.0)
+         + TrigramWordSimilarity(text, "title")) * 1_000_000),
+        BigIntegerField()))
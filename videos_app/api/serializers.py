@@ -1,12 +1,21 @@
+import os
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.text import get_valid_filename
 from rest_framework import serializers
 
-from videos_app.models import Video
+from videos_app.models import Video, VideoUpload
 
 
 class VideoSerializer(serializers.ModelSerializer):
     """
     Serializer for the Video model.
     """
+    thumbnails = serializers.SerializerMethodField()
+    trickplay_url = serializers.SerializerMethodField()
+
     class Meta:
         model = Video
         fields = [
@@ -15,5 +24,82 @@ class VideoSerializer(serializers.ModelSerializer):
             'title',
             'description',
             'thumbnail_url',
+            'thumbnails',
+            'trickplay_url',
+            'category',
+            'status'
+        ]
+
+    def _absolute_url(self, url):
+        """
+        Builds an absolute URL when the request is available.
+        """
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_thumbnails(self, obj):
+        """
+        Returns the resized thumbnail URLs grouped by format and width.
+        """
+        return {
+            extension: {
+                width: self._absolute_url(default_storage.url(name))
+                for width, name in variants.items()
+            }
+            for extension, variants in obj.thumbnail_derivatives.items()
+        }
+
+    def get_trickplay_url(self, obj):
+        """
+        Returns the WebVTT index of the scrub-bar preview sprites, or None
+        until the trickplay job has written them.
+        """
+        if obj.status != Video.Status.READY or not obj.has_trickplay:
+            return None
+        return self._absolute_url(reverse('hls-segment', kwargs={
+            'movie_id': obj.pk,
+            'resolution': 'trickplay',
+            'segment': 'thumbnails.vtt'
+        }))
+
+
+class VideoUploadSerializer(serializers.ModelSerializer):
+    """
+    Serializer for starting a resumable video upload.
+    """
+    id = serializers.UUIDField(source='uuid', read_only=True)
+
+    class Meta:
+        model = VideoUpload
+        fields = [
+            'id',
+            'filename',
+            'size',
+            'offset',
+            'title',
+            'description',
+            'thumbnail',
             'category'
         ]
+        read_only_fields = ['offset']
+        extra_kwargs = {
+            # An empty upload could never be completed by a PATCH.
+            'size': {'min_value': 1},
+        }
+
+    def validate_filename(self, value):
+        """
+        Strips directories and unsafe characters from the file name.
+        """
+        try:
+            return get_valid_filename(os.path.basename(value))
+        except SuspiciousFileOperation:
+            raise serializers.ValidationError("Invalid file name.")
+
+
+class WatchProgressSerializer(serializers.Serializer):
+    """
+    Serializer for the playback position a player reports for a video.
+    """
+    position = serializers.FloatField(min_value=0)
+    duration = serializers.FloatField(min_value=0)
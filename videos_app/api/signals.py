@@ -1,11 +1,38 @@
 import django_rq
 import os
 
-from django.db.models.signals import post_save, post_delete
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
+from rq import Callback
 
 from videos_app.models import Video
-from videos_app.api.tasks import convert_video_to_hls, generate_master_playlist, cleanup_original, cleanup_video_and_thumbnail
+from videos_app.api.cache import bump_catalog_version, invalidate_video
+from videos_app.api.feed import rebuild_home_feed
+from videos_app.api.play_stats import clear_play_stats
+from videos_app.api.progress import clear_progress
+from videos_app.api.search import update_search_vector
+from videos_app.api.tasks import schedule_transcode, mark_video_failed, cleanup_video_and_thumbnail, generate_thumbnail_derivatives
+
+
+@receiver(pre_save, sender=Video)
+def video_pre_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Detects a replaced thumbnail on an existing video.
+
+    Its resized variants are dropped and marked for regeneration in
+    post_save.
+    """
+    instance._thumbnail_changed = False
+    if instance._state.adding or (
+            update_fields is not None and "thumbnail_url" not in update_fields):
+        return
+    previous = Video.objects.filter(pk=instance.pk).values_list(
+        "thumbnail_url", flat=True).first()
+    if previous != instance.thumbnail_url.name:
+        instance._thumbnail_changed = True
+        instance.thumbnail_derivatives = {}
 
 
 @receiver(post_save, sender=Video)
@@ -13,42 +40,73 @@ def video_post_save(sender, instance, created, **kwargs):
     """
     Handles post-save actions for Video objects.
 
-    When a new Video is created, the original MP4 file is queued for HLS
-    conversion at 480p, 720p, and 1080p resolutions. After all renditions
-    are generated, a master playlist (master.m3u8) is built that references
-    them. Finally, the original uploaded MP4 file is removed to save storage.
+    When a new Video is created, a scheduling job probes the original MP4
+    file and enqueues its HLS transcoding. Short sources are decoded once by
+    a single job that writes every 480p, 720p, and 1080p rendition that does
+    not exceed the source resolution; long sources are split into chunks
+    that are encoded in parallel and stitched back together. After all
+    renditions are generated, a master playlist (master.m3u8) is built from
+    their measured bitrates and codecs. Finally, the original uploaded MP4
+    file is removed to save storage. The video status moves from queued to
+    transcoding to ready, or to failed if any step raises.
+
+    If an identical source has already been transcoded, its renditions are
+    hard-linked into the new video folder instead of running ffmpeg again;
+    the scheduling job hashes the source to find it.
 
     This workflow ensures:
     - Automatic video transcoding into adaptive HLS formats.
     - A single master playlist clients can stream from.
     - Cleanup of the original file once it is no longer needed.
+
+    Alongside the renditions, trickplay sprite sheets are extracted and the
+    thumbnail is resized into WebP/JPEG/AVIF variants, again whenever the
+    thumbnail is replaced later. Every save drops the cached lookups and
+    playlists of the video and the cached catalog pages; edits of a ready
+    video also rebuild the home feed. The stored search vector is
+    recomputed from the saved title, category and description.
     """
+    invalidate_video(instance.pk, instance.uuid)
+    bump_catalog_version()
+    update_search_vector(instance.pk)
+    if not created and instance.status == Video.Status.READY:
+        transaction.on_commit(lambda: django_rq.get_queue(
+            'maintenance', autocommit=True).enqueue(rebuild_home_feed))
     if created:
-        queue = django_rq.get_queue('default', autocommit=True)
+        queue = django_rq.get_queue('transcode-high', autocommit=True)
         video_path = instance.video_file.path
         output_dir = os.path.dirname(video_path)
+        pipeline = {"meta": {"video_id": instance.pk},
+                    "on_failure": Callback(mark_video_failed)}
+        transaction.on_commit(lambda: queue.enqueue(
+            schedule_transcode, instance.pk, video_path, output_dir,
+            **pipeline))
 
-        job_480 = queue.enqueue(convert_video_to_hls,
-                                video_path, 480, output_dir)
-        job_720 = queue.enqueue(convert_video_to_hls,
-                                video_path, 720, output_dir)
-        job_1080 = queue.enqueue(convert_video_to_hls,
-                                 video_path, 1080, output_dir)
-
-        master_job = queue.enqueue(generate_master_playlist, output_dir,
-                                   depends_on=[job_480, job_720, job_1080])
-
-        queue.enqueue(cleanup_original, video_path, depends_on=master_job)
+    if instance.thumbnail_url and (created or instance._thumbnail_changed):
+        transaction.on_commit(lambda: django_rq.get_queue(
+            'maintenance', autocommit=True).enqueue(
+                generate_thumbnail_derivatives, instance.pk))
 
 
 @receiver(post_delete, sender=Video)
 def video_post_delete(sender, instance, **kwargs):
     """
     Enqueue a task to delete the video folder and thumbnail asynchronously.
+
+    Cached lookups and playlists of the video and the cached catalog pages
+    are dropped right away and the home feed is rebuilt without it.
     """
-    queue = django_rq.get_queue('default', autocommit=True)
+    invalidate_video(instance.pk, instance.uuid)
+    bump_catalog_version()
+    clear_progress(instance.pk)
+    clear_play_stats(instance.pk)
+    queue = django_rq.get_queue('maintenance', autocommit=True)
     queue.enqueue(
         cleanup_video_and_thumbnail,
         video_path=instance.video_file.path if instance.video_file else None,
-        thumbnail_path=instance.thumbnail_url.path if instance.thumbnail_url else None
+        thumbnail_path=instance.thumbnail_url.path if instance.thumbnail_url else None,
+        derivatives_path=os.path.join(
+            settings.MEDIA_ROOT, 'thumbnails', str(instance.uuid))
     )
+    if instance.status == Video.Status.READY:
+        transaction.on_commit(lambda: queue.enqueue(rebuild_home_feed))
@@ -0,0 +1,56 @@
+import hmac
+import math
+import re
+import time
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+
+SEGMENT_SIGNING_SALT = "videos_app.api.signing.segment"
+MAP_URI_RE = re.compile(r'(#EXT-X-MAP:.*URI=")([^"]+)(")')
+
+
+def signed_expiry():
+    """
+    Returns the expiry timestamp for newly signed segment URLs.
+
+    The expiry is rounded up to VIDEO_SIGNED_URL_WINDOW, so all playlists
+    handed out within one window carry identical, cacheable URLs.
+    """
+    window = settings.VIDEO_SIGNED_URL_WINDOW
+    return math.ceil((time.time() + settings.VIDEO_SIGNED_URL_TTL) / window) * window
+
+
+def sign_video(video_uuid, expires):
+    """
+    Returns the HMAC signature granting access to a video until expires.
+    """
+    return salted_hmac(SEGMENT_SIGNING_SALT, f"{video_uuid}:{expires}",
+                       algorithm="sha256").hexdigest()[:32]
+
+
+def verify_video_signature(video_uuid, expires, signature):
+    """
+    Checks a segment URL signature and its expiry without any database access.
+    """
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(sign_video(video_uuid, expires), signature)
+
+
+def sign_playlist(body, prefix):
+    """
+    Rewrites the segment URIs of a media playlist to start with prefix.
+
+    Both plain segment lines and the EXT-X-MAP init section URI are
+    rewritten; tags and comments are left untouched.
+    """
+    lines = []
+    for line in body.splitlines():
+        if line and not line.startswith("#"):
+            line = prefix + line
+        elif line.startswith("#EXT-X-MAP:"):
+            line = MAP_URI_RE.sub(lambda match: match[1] + prefix + match[2] + match[3], line)
+        lines.append(line)
+    return "\n".join(lines) + "\n"
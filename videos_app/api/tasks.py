@@ -1,6 +1,133 @@
+import csv
+import django_rq
+import hashlib
+import json
+import logging
+import math
 import os
+import re
 import shutil
 import subprocess
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from PIL import Image, features
+from rq import Callback
+from rq.job import Dependency
+
+from videos_app.api.cache import bump_catalog_version
+from videos_app.api.feed import rebuild_home_feed
+from videos_app.api.play_stats import clear_play_counts, count_unique_viewers, pop_play_counts
+from videos_app.api.progress import ProgressReporter, clear_progress, start_progress
+from videos_app.api.utils import hash_file
+from videos_app.api.watch_progress import mark_watch_progress_dirty, pop_dirty_watch_progress
+from videos_app.models import Video, VideoStats, VideoUpload, WatchProgress
+
+
+logger = logging.getLogger(__name__)
+
+RESOLUTION_LADDER = [480, 720, 1080]
+SEGMENT_SECONDS = 6
+
+H264_PROFILE_IDC = {
+    "Baseline": "4200",
+    "Constrained Baseline": "42c0",
+    "Main": "4d40",
+    "High": "6400",
+}
+AAC_OBJECT_TYPES = {"LC": "2", "HE-AAC": "5", "HE-AACv2": "29"}
+BYTERANGE_RE = re.compile(r'BYTERANGE[:=]"?(\d+)(?:@(\d+))?')
+
+
+def probe_video(source):
+    """
+    Read resolution, frame rate, duration and audio codec of a video file.
+    """
+    result = subprocess.run([
+        "ffprobe", "-v", "error", "-print_format", "json",
+        "-show_streams", "-show_format", source
+    ], check=True, capture_output=True, text=True)
+    info = json.loads(result.stdout)
+
+    video = next(stream for stream in info["streams"]
+                 if stream["codec_type"] == "video")
+    audio = next((stream for stream in info["streams"]
+                  if stream["codec_type"] == "audio"), None)
+    numerator, denominator = video.get("avg_frame_rate", "0/0").split("/")
+    fps = int(numerator) / int(denominator) if int(denominator) else 25.0
+
+    return {
+        "width": int(video["width"]),
+        "height": int(video["height"]),
+        "fps": fps,
+        "duration": float(info["format"].get("duration", 0)),
+        "has_audio": audio is not None,
+        "audio_codec": audio["codec_name"] if audio else None,
+    }
+
+
+def select_resolutions(probe):
+    """
+    Pick the ladder resolutions that do not upscale the source.
+
+    Sources below the lowest ladder step get a single rendition at their own
+    (even) height.
+    """
+    resolutions = [resolution for resolution in RESOLUTION_LADDER
+                   if resolution <= probe["height"]]
+    return resolutions or [probe["height"] - probe["height"] % 2]
+
+
+def _hls_muxer_args(res_dir, segment_format=None):
+    """
+    Returns the HLS muxer arguments writing one rendition into res_dir.
+
+    In "fmp4" mode the rendition is a single fragmented MP4 (media.mp4)
+    addressed with EXT-X-BYTERANGE; in "ts" mode every segment is its own
+    %03d.ts file.
+    """
+    segment_format = segment_format or settings.VIDEO_HLS_SEGMENT_FORMAT
+    if segment_format == "fmp4":
+        segment_args = [
+            "-hls_segment_type", "fmp4", "-hls_flags", "single_file",
+            "-hls_segment_filename", os.path.join(res_dir, "media.mp4"),
+        ]
+    else:
+        segment_args = [
+            "-hls_segment_filename", os.path.join(res_dir, "%03d.ts"),
+        ]
+    return [
+        "-hls_time", str(SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        *segment_args,
+        os.path.join(res_dir, "index.m3u8"),
+    ]
+
+
+def _hls_output_args(res_dir, fps=None, segment_format=None, threads=None):
+    """
+    Returns the encoder and HLS muxer arguments for one rendition output.
+
+    When the frame rate is known, keyframes are placed on every segment
+    boundary so all renditions share identical segment timing. The encoder
+    uses threads threads, by default the whole VIDEO_TRANSCODE_THREADS.
+    """
+    gop_args = []
+    if fps:
+        gop = max(1, round(fps * SEGMENT_SECONDS))
+        gop_args = ["-g", str(gop), "-keyint_min", str(gop),
+                    "-sc_threshold", "0"]
+    return [
+        "-c:v", "libx264", "-crf", "23", "-preset", "veryfast", *gop_args,
+        "-threads", str(threads or settings.VIDEO_TRANSCODE_THREADS),
+        "-c:a", "aac", "-strict", "-2",
+        *_hls_muxer_args(res_dir, segment_format),
+    ]
 
 
 def convert_video_to_hls(source, resolution, output_dir):
@@ -10,39 +137,656 @@ def convert_video_to_hls(source, resolution, output_dir):
     res_dir = os.path.join(output_dir, f"{resolution}p")  # add 'p' to folder
     os.makedirs(res_dir, exist_ok=True)
 
-    playlist_path = os.path.join(res_dir, "index.m3u8")
-    segment_pattern = os.path.join(res_dir, "%03d.ts")
+    subprocess.run([
+        "ffmpeg", "-threads", str(settings.VIDEO_TRANSCODE_THREADS), "-i", source,
+        "-vf", f"scale=-2:{resolution}",
+        *_hls_output_args(res_dir)
+    ], check=True)
+
+    return os.path.join(res_dir, "index.m3u8")
+
+
+def _run_ffmpeg(args, video_id=None, resolutions=()):
+    """
+    Run ffmpeg and, for a known video, report its progress to Redis.
+    """
+    if video_id is None:
+        subprocess.run(["ffmpeg", *args], check=True)
+        return
+
+    reporter = ProgressReporter(video_id, resolutions)
+    with subprocess.Popen(["ffmpeg", "-progress", "pipe:1", "-nostats", *args],
+                          stdout=subprocess.PIPE, text=True) as process:
+        for line in process.stdout:
+            reporter.feed(line)
+    reporter.flush()
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+
+
+def _encode_renditions(source, output_dir, resolutions, probe, ts_offset=None,
+                       video_id=None, segment_format=None):
+    """
+    Run one ffmpeg process that decodes source once and writes every rendition.
+
+    The decoded video stream is split into one branch per resolution, each
+    branch is scaled and written to its own <res>p/index.m3u8 rendition.
+    The VIDEO_TRANSCODE_THREADS of the job are shared by the encoders, and
+    the decoder and scalers are pinned to the same share, so a job does not
+    start a full set of threads per rendition.
+    """
+    threads = str(max(1, settings.VIDEO_TRANSCODE_THREADS // len(resolutions)))
+    split_labels = "".join(f"[v{i}]" for i in range(len(resolutions)))
+    filters = [f"[0:v]split={len(resolutions)}{split_labels}"]
+    outputs = []
+    for i, resolution in enumerate(resolutions):
+        res_dir = os.path.join(output_dir, f"{resolution}p")
+        os.makedirs(res_dir, exist_ok=True)
+        filters.append(f"[v{i}]scale=-2:{resolution}[v{i}out]")
+        outputs += ["-map", f"[v{i}out]"]
+        if probe["has_audio"]:
+            outputs += ["-map", "0:a:0"]
+        if ts_offset is not None:
+            outputs += ["-output_ts_offset", str(ts_offset)]
+        outputs += _hls_output_args(res_dir, probe["fps"], segment_format,
+                                    threads)
+
+    _run_ffmpeg([
+        "-threads", threads, "-i", source,
+        "-filter_complex_threads", threads,
+        "-filter_complex", ";".join(filters),
+        *outputs
+    ], video_id, resolutions)
+
+    return [os.path.join(output_dir, f"{resolution}p", "index.m3u8")
+            for resolution in resolutions]
+
+
+def transcode_video(source, output_dir, resolutions=None, video_id=None):
+    """
+    Decode the source once and encode every resolution in a single ffmpeg run.
+
+    The source is probed first; unless resolutions are given, only ladder
+    steps at or below the source height are produced.
+    """
+    probe = probe_video(source)
+    resolutions = resolutions or select_resolutions(probe)
+    return _encode_renditions(source, output_dir, resolutions, probe,
+                              video_id=video_id)
+
 
+def split_source(source, chunk_dir, chunk_seconds):
+    """
+    Cut the video of the source into keyframe-aligned chunks without
+    re-encoding.
+
+    The audio is left out; transcode_audio encodes it in one piece.
+    Returns (chunk path, start seconds) pairs in playback order.
+    """
+    os.makedirs(chunk_dir, exist_ok=True)
+    chunk_list = os.path.join(chunk_dir, "chunks.csv")
     subprocess.run([
         "ffmpeg", "-i", source,
-        "-vf", f"scale=-2:{resolution}",
-        "-c:v", "libx264", "-crf", "23", "-preset", "veryfast",
-        "-c:a", "aac", "-strict", "-2",
-        "-hls_time", "6",
-        "-hls_playlist_type", "vod",
-        "-hls_segment_filename", segment_pattern,
-        playlist_path
+        "-map", "0:v:0", "-c", "copy",
+        "-f", "segment", "-segment_time", str(chunk_seconds),
+        "-reset_timestamps", "1",
+        "-segment_list", chunk_list, "-segment_list_type", "csv",
+        os.path.join(chunk_dir, "%04d.mkv")
+    ], check=True)
+
+    chunks = []
+    with open(chunk_list, newline="") as f:
+        for filename, start, _ in csv.reader(f):
+            chunks.append((os.path.join(chunk_dir, filename), float(start)))
+    return chunks
+
+
+def transcode_chunk(chunk_path, start, output_dir, resolutions, probe,
+                    video_id=None):
+    """
+    Encode the video of one source chunk into every rendition.
+
+    Timestamps are shifted by the chunk start so the stitched renditions
+    play back with continuous timing. Chunks are always written as MPEG-TS
+    segments, which can be renumbered and joined freely. Chunks carry no
+    audio; see transcode_audio.
+    """
+    _encode_renditions(chunk_path, output_dir, resolutions,
+                       {**probe, "has_audio": False}, ts_offset=start,
+                       video_id=video_id, segment_format="ts")
+    os.remove(chunk_path)
+    return output_dir
+
+
+def transcode_audio(source, audio_path, probe):
+    """
+    Encode the audio of a chunked source once, over its whole length.
+
+    Encoding the audio per chunk would add encoder priming and padding at
+    every chunk boundary, audible as clicks. AAC audio is copied as is.
+    """
+    os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+    codec = "copy" if probe["audio_codec"] == "aac" else "aac"
+    subprocess.run([
+        "ffmpeg", "-i", source, "-map", "0:a:0", "-vn", "-c:a", codec,
+        audio_path
+    ], check=True)
+    return audio_path
+
+
+def stitch_chunks(output_dir, chunk_output_dirs, resolutions, audio_path=None):
+    """
+    Join the per-chunk renditions into one VOD playlist per resolution.
+
+    Segments are moved into <res>p/ and renumbered continuously across
+    chunks, then the chunk working directory is removed. The audio of the
+    whole source (audio_path) is then muxed into the joined video, which
+    in fmp4 mode also becomes a single fragmented MP4.
+    """
+    for resolution in resolutions:
+        res_dir = os.path.join(output_dir, f"{resolution}p")
+        os.makedirs(res_dir, exist_ok=True)
+        entries = []
+        for chunk_output_dir in chunk_output_dirs:
+            chunk_res_dir = os.path.join(chunk_output_dir, f"{resolution}p")
+            for duration, uri, _ in parse_media_playlist(
+                    os.path.join(chunk_res_dir, "index.m3u8")):
+                name = f"{len(entries):03d}.ts"
+                os.replace(os.path.join(chunk_res_dir, uri),
+                           os.path.join(res_dir, name))
+                entries.append((duration, name))
+
+        target_duration = math.ceil(max(duration for duration, _ in entries))
+        with open(os.path.join(res_dir, "index.m3u8"), "w") as f:
+            f.write("#EXTM3U\n#EXT-X-VERSION:3\n"
+                    f"#EXT-X-TARGETDURATION:{target_duration}\n"
+                    "#EXT-X-MEDIA-SEQUENCE:0\n#EXT-X-PLAYLIST-TYPE:VOD\n")
+            for duration, name in entries:
+                f.write(f"#EXTINF:{duration:.6f},\n{name}\n")
+            f.write("#EXT-X-ENDLIST\n")
+
+        if audio_path or settings.VIDEO_HLS_SEGMENT_FORMAT == "fmp4":
+            remux_rendition(res_dir, audio_path)
+
+    shutil.rmtree(os.path.dirname(chunk_output_dirs[0]), ignore_errors=True)
+    return output_dir
+
+
+def remux_rendition(res_dir, audio_path=None):
+    """
+    Rewrite a joined MPEG-TS rendition without re-encoding.
+
+    The audio in audio_path is muxed in if given, and the rendition is
+    written in the VIDEO_HLS_SEGMENT_FORMAT, in fmp4 mode as a single
+    fragmented MP4.
+    """
+    remuxed_dir = f"{res_dir}.remux"
+    os.makedirs(remuxed_dir, exist_ok=True)
+    inputs = ["-i", os.path.join(res_dir, "index.m3u8")]
+    maps = ["-map", "0:v:0"]
+    if audio_path:
+        inputs += ["-i", audio_path]
+        maps += ["-map", "1:a:0"]
+    subprocess.run([
+        "ffmpeg", *inputs, *maps, "-c", "copy",
+        *_hls_muxer_args(remuxed_dir)
+    ], check=True)
+    shutil.rmtree(res_dir)
+    os.rename(remuxed_dir, res_dir)
+    return res_dir
+
+
+def set_video_status(video_id, status):
+    """
+    Update the processing status of a video without sending save signals.
+    """
+    Video.objects.filter(pk=video_id).update(status=status)
+    bump_catalog_version()
+
+
+def mark_video_ready(video_id):
+    """
+    Mark a video as ready once its master playlist has been written.
+    """
+    set_video_status(video_id, Video.Status.READY)
+    clear_progress(video_id)
+    django_rq.get_queue('maintenance', autocommit=True).enqueue(
+        rebuild_home_feed)
+
+
+def mark_video_failed(job, connection, type, value, traceback):
+    """
+    RQ failure callback marking the video of a failed pipeline job as failed.
+    """
+    set_video_status(job.meta["video_id"], Video.Status.FAILED)
+
+
+def log_trickplay_failure(job, connection, type, value, traceback):
+    """
+    RQ failure callback of the optional trickplay job.
+
+    The video stays playable without scrub-bar previews, so its status is
+    left alone.
+    """
+    logger.warning("Trickplay generation failed for video %s: %s",
+                   job.meta["video_id"], value)
+
+
+def find_duplicate_source(video_id, source):
+    """
+    Hash the source, store the hash and return the uuid of a ready video
+    with the same source, or None.
+
+    Runs in the worker: sources can be gigabytes, too large to hash within
+    the upload request. The file is read in chunks.
+    """
+    with open(source, "rb") as f:
+        source_hash = hash_file(File(f))
+    Video.objects.filter(pk=video_id).update(source_hash=source_hash)
+    return Video.objects.filter(
+        source_hash=source_hash, status=Video.Status.READY
+    ).exclude(pk=video_id).values_list("uuid", flat=True).first()
+
+
+def schedule_transcode(video_id, source, output_dir, deduplicate=True):
+    """
+    Probe the source and enqueue the transcoding pipeline for it.
+
+    If an identical source has already been transcoded, its renditions are
+    reused instead (reuse_renditions); deduplicate=False skips that check.
+
+    Sources shorter than VIDEO_CHUNKED_TRANSCODE_MIN_DURATION are encoded by
+    a single transcode_video job. The video of longer sources is split into
+    chunks that any number of workers encode in parallel, while one job
+    encodes the audio over the whole source; one stitch job joins them.
+    Both paths end with the master playlist and the removal of the original.
+
+    Chunk encodes go to the transcode-bulk queue so that new short uploads on
+    transcode-high are not stuck behind a feature film. Every job marks the
+    video as failed when it raises, except the optional trickplay job, whose
+    failures are only logged. The original is removed once the video is
+    ready and the trickplay job has finished, whether or not it succeeded.
+    """
+    queue = django_rq.get_queue('transcode-high', autocommit=True)
+    bulk_queue = django_rq.get_queue('transcode-bulk', autocommit=True)
+    if deduplicate:
+        duplicate_uuid = find_duplicate_source(video_id, source)
+        if duplicate_uuid:
+            return reuse_renditions(video_id, duplicate_uuid, source, output_dir)
+
+    pipeline = {"meta": {"video_id": video_id},
+                "on_failure": Callback(mark_video_failed)}
+    probe = probe_video(source)
+    resolutions = select_resolutions(probe)
+    set_video_status(video_id, Video.Status.TRANSCODING)
+    start_progress(video_id, resolutions, probe["duration"])
+
+    if probe["duration"] < settings.VIDEO_CHUNKED_TRANSCODE_MIN_DURATION:
+        encode_job = queue.enqueue(transcode_video, source, output_dir,
+                                   resolutions, video_id, **pipeline)
+    else:
+        chunk_dir = os.path.join(output_dir, "chunks")
+        chunks = split_source(source, chunk_dir,
+                              settings.VIDEO_TRANSCODE_CHUNK_SECONDS)
+        chunk_output_dirs = []
+        chunk_jobs = []
+        audio_path = None
+        if probe["has_audio"]:
+            audio_path = os.path.join(chunk_dir, "audio.m4a")
+            chunk_jobs.append(bulk_queue.enqueue(
+                transcode_audio, source, audio_path, probe, **pipeline))
+        for chunk_path, start in chunks:
+            chunk_output_dir = os.path.splitext(chunk_path)[0]
+            chunk_output_dirs.append(chunk_output_dir)
+            chunk_jobs.append(bulk_queue.enqueue(
+                transcode_chunk, chunk_path, start, chunk_output_dir,
+                resolutions, probe, video_id, **pipeline))
+        encode_job = queue.enqueue(stitch_chunks, output_dir,
+                                   chunk_output_dirs, resolutions, audio_path,
+                                   depends_on=chunk_jobs, **pipeline)
+
+    trickplay_job = bulk_queue.enqueue(
+        generate_trickplay, source, output_dir, probe, video_id,
+        meta={"video_id": video_id},
+        on_failure=Callback(log_trickplay_failure))
+    master_job = queue.enqueue(generate_master_playlist, output_dir,
+                               depends_on=encode_job, **pipeline)
+    ready_job = queue.enqueue(mark_video_ready, video_id, depends_on=master_job,
+                              **pipeline)
+    maintenance_queue = django_rq.get_queue('maintenance', autocommit=True)
+    maintenance_queue.enqueue(prewarm_segments, output_dir,
+                              depends_on=master_job)
+    # The trickplay job reads the original, so it is removed only after it,
+    # but a failed trickplay job must not keep the original forever.
+    maintenance_queue.enqueue(
+        cleanup_transcoded_original, video_id, source,
+        depends_on=Dependency(jobs=[ready_job, trickplay_job],
+                              allow_failure=True))
+    return resolutions
+
+
+def generate_trickplay(source, output_dir, probe, video_id=None):
+    """
+    Extract preview frames into sprite sheets with a WebVTT index.
+
+    Only keyframes are decoded, one frame every VIDEO_TRICKPLAY_INTERVAL
+    seconds is kept, and frames are tiled into sheets of
+    VIDEO_TRICKPLAY_COLUMNS x VIDEO_TRICKPLAY_ROWS. The index maps every
+    interval to its tile with #xywh media fragments for scrub-bar previews.
+    Once it is written, the video of video_id is marked as having trickplay,
+    so clients only get its URL when it exists.
+    """
+    interval = settings.VIDEO_TRICKPLAY_INTERVAL
+    columns = settings.VIDEO_TRICKPLAY_COLUMNS
+    rows = settings.VIDEO_TRICKPLAY_ROWS
+    width = settings.VIDEO_TRICKPLAY_WIDTH
+    height = round(width * probe["height"] / probe["width"] / 2) * 2
+
+    trickplay_dir = os.path.join(output_dir, "trickplay")
+    os.makedirs(trickplay_dir, exist_ok=True)
+    subprocess.run([
+        "ffmpeg", "-skip_frame", "nokey", "-i", source, "-an",
+        "-vf", f"fps=1/{interval},scale={width}:{height},tile={columns}x{rows}",
+        "-q:v", "5", os.path.join(trickplay_dir, "sprite_%03d.jpg")
     ], check=True)
 
-    return playlist_path
+    tiles = columns * rows
+    with open(os.path.join(trickplay_dir, "thumbnails.vtt"), "w") as f:
+        f.write("WEBVTT\n")
+        for index in range(math.ceil(probe["duration"] / interval)):
+            start = index * interval
+            end = min(start + interval, probe["duration"])
+            x = index % tiles % columns * width
+            y = index % tiles // columns * height
+            f.write(f"\n{_vtt_timestamp(start)} --> {_vtt_timestamp(end)}\n"
+                    f"sprite_{index // tiles + 1:03d}.jpg"
+                    f"#xywh={x},{y},{width},{height}\n")
+    if video_id is not None:
+        mark_trickplay_ready(video_id)
+    return trickplay_dir
+
+
+def mark_trickplay_ready(video_id):
+    """
+    Record that the trickplay sprites of a video exist.
+
+    Cached catalog pages and, for a ready video, the home feed are
+    refreshed so they pick up the trickplay URL.
+    """
+    Video.objects.filter(pk=video_id).update(has_trickplay=True)
+    bump_catalog_version()
+    if Video.objects.filter(pk=video_id, status=Video.Status.READY).exists():
+        rebuild_home_feed()
+
+
+def _vtt_timestamp(seconds):
+    """
+    Format seconds as a WebVTT hh:mm:ss.mmm timestamp.
+    """
+    milliseconds = round(seconds * 1000)
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    return f"{hours:02d}:{minutes:02d}:{milliseconds / 1000:06.3f}"
+
+
+def generate_thumbnail_derivatives(video_id):
+    """
+    Resize the uploaded thumbnail into WebP, JPEG and (if supported) AVIF
+    variants at every VIDEO_THUMBNAIL_WIDTHS width below the original.
+
+    Variants are written to thumbnails/<uuid>/<version>/<width>.<ext> and
+    their storage names are stored on Video.thumbnail_derivatives. The
+    version is derived from the thumbnail's name, so a replaced thumbnail
+    gets new URLs and the variants of the previous one are removed.
+    """
+    video = Video.objects.get(pk=video_id)
+    version = hashlib.md5(video.thumbnail_url.name.encode(),
+                          usedforsecurity=False).hexdigest()[:12]
+    formats = {"webp": "WEBP", "jpg": "JPEG"}
+    if features.check("avif"):
+        formats["avif"] = "AVIF"
+
+    derivatives = {extension: {} for extension in formats}
+    with Image.open(video.thumbnail_url.path) as image:
+        image = image.convert("RGB")
+        widths = [width for width in settings.VIDEO_THUMBNAIL_WIDTHS
+                  if width < image.width] or [image.width]
+        for width in widths:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            for extension, image_format in formats.items():
+                name = f"thumbnails/{video.uuid}/{version}/{width}.{extension}"
+                path = os.path.join(settings.MEDIA_ROOT, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                resized.save(path, image_format, quality=80)
+                derivatives[extension][str(width)] = name
+
+    Video.objects.filter(pk=video_id).update(thumbnail_derivatives=derivatives)
+    derivatives_dir = os.path.join(settings.MEDIA_ROOT, "thumbnails", str(video.uuid))
+    for entry in os.scandir(derivatives_dir):
+        if entry.name != version:
+            if entry.is_dir():
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+    bump_catalog_version()
+    if Video.objects.filter(pk=video_id, status=Video.Status.READY).exists():
+        rebuild_home_feed()
+    return derivatives
+
+
+def parse_media_playlist(playlist_path):
+    """
+    Returns (duration, segment uri, byte length) tuples listed in an HLS
+    media playlist. The length is None unless the segment is a byte range.
+    """
+    segments = []
+    duration = None
+    length = None
+    with open(playlist_path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#EXTINF:"):
+                duration = float(line[len("#EXTINF:"):].split(",")[0])
+            elif line.startswith("#EXT-X-BYTERANGE:"):
+                length = int(line[len("#EXT-X-BYTERANGE:"):].split("@")[0])
+            elif line and not line.startswith("#") and duration is not None:
+                segments.append((duration, line, length))
+                duration = None
+                length = None
+    return segments
+
+
+def measure_rendition(playlist_path):
+    """
+    Measure the peak and average bitrate of a rendition from its segments.
+    """
+    res_dir = os.path.dirname(playlist_path)
+    segments = parse_media_playlist(playlist_path)
+    bitrates = []
+    total_bytes = 0
+    total_duration = 0.0
+    for duration, uri, length in segments:
+        size = length or os.path.getsize(os.path.join(res_dir, uri))
+        total_bytes += size
+        total_duration += duration
+        if duration > 0:
+            bitrates.append(size * 8 / duration)
+
+    return {
+        "peak_bitrate": round(max(bitrates, default=0)),
+        "average_bitrate": round(total_bytes * 8 / total_duration)
+        if total_duration else 0,
+        "first_segment": os.path.join(res_dir, segments[0][1])
+        if segments else None,
+    }
+
+
+def _codecs_attribute(streams):
+    """
+    Build the RFC 6381 CODECS value from ffprobe stream information.
+    """
+    codecs = []
+    for stream in streams:
+        if stream["codec_name"] == "h264":
+            profile = H264_PROFILE_IDC.get(stream.get("profile"), "4d40")
+            codecs.append(f"avc1.{profile}{int(stream.get('level', 31)):02x}")
+        elif stream["codec_name"] == "aac":
+            object_type = AAC_OBJECT_TYPES.get(stream.get("profile"), "2")
+            codecs.append(f"mp4a.40.{object_type}")
+    return ",".join(codecs)
+
+
+def _probe_streams(path):
+    """
+    Returns the ffprobe stream list of a media file.
+    """
+    result = subprocess.run([
+        "ffprobe", "-v", "error", "-print_format", "json",
+        "-show_streams", path
+    ], check=True, capture_output=True, text=True)
+    return json.loads(result.stdout)["streams"]
 
 
 def generate_master_playlist(output_dir):
     """
-    Generate a master.m3u8 file pointing to fixed resolution variants.
+    Generate a master.m3u8 file from the renditions found in output_dir.
+
+    BANDWIDTH and AVERAGE-BANDWIDTH are measured from the produced segments,
+    RESOLUTION, FRAME-RATE and CODECS are read from the first segment.
     """
+    variants = []
+    for name in os.listdir(output_dir):
+        playlist_path = os.path.join(output_dir, name, "index.m3u8")
+        if re.fullmatch(r"\d+p", name) and os.path.exists(playlist_path):
+            variants.append((int(name[:-1]), name))
+
     master_path = os.path.join(output_dir, "master.m3u8")
     with open(master_path, "w") as f:
         f.write("#EXTM3U\n#EXT-X-VERSION:3\n")
-        f.write(
-            "#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=854x480\n480p/index.m3u8\n")
-        f.write(
-            "#EXT-X-STREAM-INF:BANDWIDTH=2800000,RESOLUTION=1280x720\n720p/index.m3u8\n")
-        f.write(
-            "#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080\n1080p/index.m3u8\n")
+        for _, name in sorted(variants):
+            stats = measure_rendition(
+                os.path.join(output_dir, name, "index.m3u8"))
+            if not stats["first_segment"]:
+                continue
+            streams = _probe_streams(stats["first_segment"])
+            video = next(stream for stream in streams
+                         if stream["codec_type"] == "video")
+            numerator, denominator = video["avg_frame_rate"].split("/")
+            attributes = [
+                f"BANDWIDTH={stats['peak_bitrate']}",
+                f"AVERAGE-BANDWIDTH={stats['average_bitrate']}",
+                f"RESOLUTION={video['width']}x{video['height']}",
+            ]
+            if int(denominator):
+                attributes.append(
+                    f"FRAME-RATE={int(numerator) / int(denominator):.3f}")
+            attributes.append(f'CODECS="{_codecs_attribute(streams)}"')
+            f.write(f"#EXT-X-STREAM-INF:{','.join(attributes)}\n"
+                    f"{name}/index.m3u8\n")
     return master_path
 
 
+def _link_or_copy(source, destination):
+    """
+    Hard-link a file, falling back to a copy across file systems.
+    """
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def reuse_renditions(video_id, source_uuid, source, output_dir):
+    """
+    Give a duplicate upload the renditions of an identical, transcoded source.
+
+    Every file is hard-linked, so both videos share the same data on disk
+    and the file system link count acts as the reference count: deleting
+    either folder only removes that video's links. If the other video has
+    been deleted in the meantime, the upload is transcoded normally.
+    """
+    shared_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(source_uuid))
+    if not os.path.exists(os.path.join(shared_dir, "master.m3u8")):
+        return schedule_transcode(video_id, source, output_dir,
+                                  deduplicate=False)
+
+    for name in os.listdir(shared_dir):
+        path = os.path.join(shared_dir, name)
+        if os.path.isdir(path):
+            shutil.copytree(path, os.path.join(output_dir, name),
+                            copy_function=_link_or_copy, dirs_exist_ok=True)
+    _link_or_copy(os.path.join(shared_dir, "master.m3u8"),
+                  os.path.join(output_dir, "master.m3u8"))
+    if os.path.exists(os.path.join(output_dir, "trickplay", "thumbnails.vtt")):
+        Video.objects.filter(pk=video_id).update(has_trickplay=True)
+
+    mark_video_ready(video_id)
+    cleanup_original(source)
+    return output_dir
+
+
+def _playlist_extents(playlist_path, count):
+    """
+    Returns the bytes to read of every file used by the first count
+    segments of a media playlist, 0 meaning the whole file.
+    """
+    extents = {}
+
+    def extend(uri, byte_range):
+        end = 0
+        if byte_range and byte_range.group(2):
+            end = int(byte_range.group(2)) + int(byte_range.group(1))
+        previous = extents.get(uri)
+        extents[uri] = 0 if previous == 0 or end == 0 else max(previous or 0, end)
+
+    byte_range = None
+    segments = 0
+    with open(playlist_path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#EXT-X-MAP:"):
+                uri = re.search(r'URI="([^"]+)"', line)
+                if uri:
+                    extend(uri.group(1), BYTERANGE_RE.search(line))
+            elif line.startswith("#EXT-X-BYTERANGE:"):
+                byte_range = BYTERANGE_RE.search(line)
+            elif line and not line.startswith("#"):
+                extend(line, byte_range)
+                byte_range = None
+                segments += 1
+                if segments >= count:
+                    break
+    return extents
+
+
+def prewarm_segments(output_dir, count=None):
+    """
+    Read the opening segments of every rendition ahead into the page cache.
+
+    When a title launches nearly every viewer requests the same first
+    segments. POSIX_FADV_WILLNEED makes the kernel read them in the
+    background, so the first requests of every web process are served from
+    memory instead of disk.
+    """
+    count = settings.VIDEO_PREWARM_SEGMENTS if count is None else count
+    if not count or not hasattr(os, "posix_fadvise"):
+        return
+    for name in os.listdir(output_dir):
+        playlist_path = os.path.join(output_dir, name, "index.m3u8")
+        if not (re.fullmatch(r"\d+p", name) and os.path.exists(playlist_path)):
+            continue
+        for uri, length in _playlist_extents(playlist_path, count).items():
+            try:
+                fd = os.open(os.path.join(output_dir, name, uri), os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.posix_fadvise(fd, 0, length, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+
+
 def cleanup_original(video_path):
     """
     Delete the original uploaded MP4 after HLS conversion is complete.
@@ -53,9 +797,25 @@ def cleanup_original(video_path):
     return f"{video_path} not found"
 
 
-def cleanup_video_and_thumbnail(video_path=None, thumbnail_path=None):
+def cleanup_transcoded_original(video_id, video_path):
     """
-    Deletes the video folder and the thumbnail file.
+    Delete the original of a transcoded video once it is ready.
+
+    Runs after mark_video_ready even if that job failed, so the original
+    is kept unless the video actually became ready.
+    """
+    if not Video.objects.filter(pk=video_id, status=Video.Status.READY).exists():
+        return f"Video {video_id} is not ready, keeping {video_path}"
+    return cleanup_original(video_path)
+
+
+def cleanup_video_and_thumbnail(video_path=None, thumbnail_path=None,
+                                derivatives_path=None):
+    """
+    Deletes the video folder, the thumbnail file and its resized variants.
+
+    Renditions shared with a duplicate upload are hard links, so removing
+    this folder leaves the other video's files intact.
     """
     # Delete video folder
     if video_path:
@@ -66,3 +826,93 @@ def cleanup_video_and_thumbnail(video_path=None, thumbnail_path=None):
     # Delete thumbnail
     if thumbnail_path and os.path.exists(thumbnail_path):
         os.remove(thumbnail_path)
+
+    # Delete resized thumbnail variants
+    if derivatives_path and os.path.exists(derivatives_path):
+        shutil.rmtree(derivatives_path)
+
+
+def expire_stale_uploads():
+    """
+    Delete unfinished uploads that have not received a chunk for
+    VIDEO_UPLOAD_EXPIRY seconds, with their partial file and thumbnail.
+
+    Runs periodically (RQ_PERIODIC_JOBS). Each row is deleted only if it is
+    still stale, so an upload resumed meanwhile is kept.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.VIDEO_UPLOAD_EXPIRY)
+    stale = VideoUpload.objects.filter(video=None, updated_at__lt=cutoff)
+    for upload in stale:
+        deleted, _ = VideoUpload.objects.filter(
+            pk=upload.pk, video=None, updated_at__lt=cutoff).delete()
+        if deleted:
+            cleanup_video_and_thumbnail(
+                video_path=default_storage.path(upload.file_name),
+                thumbnail_path=upload.thumbnail.path if upload.thumbnail else None)
+
+
+def flush_watch_progress(batch_size=1000):
+    """
+    Write the playback positions changed in Redis to Postgres.
+
+    Runs periodically (RQ_PERIODIC_JOBS). Every batch of dirty entries is
+    written with one INSERT ... ON CONFLICT DO UPDATE, so a viewer costs
+    at most one row write per interval however often the player reports.
+    Entries of deleted users or videos are dropped; on errors the batch is
+    marked dirty again.
+    """
+    while True:
+        members, entries = pop_dirty_watch_progress(batch_size)
+        if not members:
+            return
+        try:
+            user_ids = set(get_user_model().objects.filter(
+                pk__in={entry[0] for entry in entries}).values_list("pk", flat=True))
+            video_ids = set(Video.objects.filter(
+                pk__in={entry[1] for entry in entries}).values_list("pk", flat=True))
+            WatchProgress.objects.bulk_create([
+                WatchProgress(
+                    user_id=user_id, video_id=video_id, position=position,
+                    duration=duration,
+                    updated_at=datetime.fromtimestamp(updated_at, tz=timezone.utc))
+                for user_id, video_id, position, duration, updated_at in entries
+                if user_id in user_ids and video_id in video_ids
+            ], update_conflicts=True, unique_fields=["user", "video"],
+                update_fields=["position", "duration", "updated_at"])
+        except Exception:
+            mark_watch_progress_dirty(members)
+            raise
+
+
+def rollup_video_stats():
+    """
+    Add the play counts collected in Redis to the VideoStats table.
+
+    Runs periodically (RQ_PERIODIC_JOBS). Missing rows are created first,
+    then all counts are added in a single UPDATE, and the unique viewer
+    estimates are copied from the HyperLogLogs. Counts of deleted videos
+    are dropped. If the transaction fails, the counts stay in Redis and
+    are added by the next run.
+    """
+    plays = pop_play_counts()
+    if not plays:
+        return
+    video_ids = list(Video.objects.filter(
+        pk__in=plays).values_list("pk", flat=True))
+    if not video_ids:
+        clear_play_counts()
+        return
+    viewers = count_unique_viewers(video_ids)
+    with transaction.atomic():
+        VideoStats.objects.bulk_create(
+            [VideoStats(video_id=video_id) for video_id in video_ids],
+            ignore_conflicts=True)
+        VideoStats.objects.filter(video_id__in=video_ids).update(
+            play_count=F("play_count") + Case(
+                *(When(video_id=video_id, then=Value(plays[video_id]))
+                  for video_id in video_ids)),
+            unique_viewers=Case(
+                *(When(video_id=video_id, then=Value(viewers[video_id]))
+                  for video_id in video_ids)))
+    clear_play_counts()
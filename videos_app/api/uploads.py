@@ -0,0 +1,16 @@
+from django.conf import settings
+from django_redis import get_redis_connection
+
+
+def upload_lock(upload_uuid):
+    """
+    Returns the Redis lock that lets one request at a time append to an
+    upload.
+
+    The lock expires after VIDEO_UPLOAD_LOCK_TIMEOUT seconds unless the
+    writer renews it, so a client that stalls mid-chunk does not block its
+    own retry for long.
+    """
+    return get_redis_connection("default").lock(
+        f"videoflix:upload-lock:{upload_uuid}",
+        timeout=settings.VIDEO_UPLOAD_LOCK_TIMEOUT)
@@ -1,11 +1,35 @@
+from django.conf import settings
 from django.urls import path, re_path
-from videos_app.api import views
+from videos_app.api import async_views, views
+
+
+# Playlists and segments are served by async views when running under ASGI.
+delivery = async_views if settings.SERVER_MODE == "asgi" else views
 
 
 urlpatterns = [
     path('video/', views.VideosListView.as_view(), name="videos-list"),
+    path('video/uploads/', views.VideoUploadCreateView.as_view(),
+         name="video-upload-create"),
+    path('video/uploads/<uuid:upload_id>/', views.VideoUploadView.as_view(),
+         name="video-upload"),
+    path('video/search/', views.VideoSearchView.as_view(), name="video-search"),
+    path('video/feed/', views.HomeFeedView.as_view(), name="home-feed"),
+    path('video/trending/', views.TrendingView.as_view(), name="trending"),
+    path('video/segment-cache/', views.SegmentCacheStatsView.as_view(),
+         name="segment-cache-stats"),
+    path('video/continue-watching/', views.ContinueWatchingView.as_view(),
+         name="continue-watching"),
+    path('video/<int:movie_id>/progress/', views.WatchProgressView.as_view(),
+         name="watch-progress"),
+    path('video/<int:movie_id>/status/',
+         views.VideoStatusView.as_view(), name="video-status"),
+    path('video/signed/<uuid:video_uuid>/<int:expires>/<str:signature>/<str:resolution>/<str:segment>',
+         delivery.SignedSegmentView.as_view(), name="hls-signed-segment"),
+    path('video/<int:movie_id>/master.m3u8/',
+         delivery.HLSMasterPlaylistView.as_view(), name="hls-master-playlist"),
     path('video/<int:movie_id>/<str:resolution>/index.m3u8/',
-         views.HLSPlaylistView.as_view(), name="hls-playlist"),
+         delivery.HLSPlaylistView.as_view(), name="hls-playlist"),
     re_path(r'^video/(?P<movie_id>\d+)/(?P<resolution>[^/]+)/(?P<segment>.+)$',
-            views.HLSSegmentView.as_view(), name="hls-segment")
+            delivery.HLSSegmentView.as_view(), name="hls-segment")
 ]
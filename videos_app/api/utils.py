@@ -0,0 +1,294 @@
+import asyncio
+import hashlib
+import os
+import re
+from stat import S_ISREG
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import iri_to_uri
+from django.utils.http import http_date, parse_http_date_safe
+
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def hash_file(file, chunk_size=1024 * 1024):
+    """
+    Returns the SHA-256 hex digest of a Django File, read in chunks.
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks(chunk_size):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def write_chunk(path, offset, stream, max_length, chunk_size=1024 * 1024,
+                before_write=None):
+    """
+    Writes a request body stream into path at offset, block by block.
+
+    Anything after offset is discarded first, so a chunk interrupted earlier
+    is simply overwritten. Returns the number of bytes written and their
+    SHA-256 digest; at most max_length bytes are accepted. before_write is
+    called before every block is written and may raise to abort.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest = hashlib.sha256()
+    written = 0
+    with open(path, "ab") as f:
+        f.truncate(offset)
+        while stream is not None:
+            block = stream.read(min(chunk_size, max_length - written + 1))
+            if not block:
+                break
+            written += len(block)
+            if written > max_length:
+                break
+            if before_write is not None:
+                before_write()
+            f.write(block)
+            digest.update(block)
+    return written, digest.digest()
+
+
+def truncate_file(path, length):
+    """
+    Cuts a partially written file back to length bytes.
+    """
+    with open(path, "ab") as f:
+        f.truncate(length)
+
+
+def parse_range(header, size):
+    """
+    Parses a single-range "bytes=" Range header against a file size.
+
+    Returns an inclusive (start, end) pair, None when the header is absent
+    or asks for several ranges, and raises ValueError when unsatisfiable.
+    """
+    match = RANGE_RE.match(header or "")
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def iter_file_range(path, start, length, chunk_size=64 * 1024):
+    """
+    Yields length bytes of a file starting at start, chunk by chunk.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(chunk_size, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+async def aiter_file_range(path, start, length, chunk_size=64 * 1024):
+    """
+    Async variant of iter_file_range() for ASGI responses.
+
+    Every blocking open and read runs in a worker thread, so a slow client
+    only holds a file handle while the event loop serves other requests.
+    """
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        await asyncio.to_thread(f.seek, start)
+        while length > 0:
+            block = await asyncio.to_thread(f.read, min(chunk_size, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+def _filling_cache(chunks, cache, key):
+    """
+    Passes chunks through and caches their bytes once all were sent.
+    """
+    collected = []
+    for chunk in chunks:
+        collected.append(chunk)
+        yield chunk
+    cache.set(key, b"".join(collected))
+
+
+async def _afilling_cache(chunks, cache, key):
+    """
+    Async variant of _filling_cache().
+    """
+    collected = []
+    async for chunk in chunks:
+        collected.append(chunk)
+        yield chunk
+    cache.set(key, b"".join(collected))
+
+
+def offloaded_response(path, content_type):
+    """
+    Hands a media file over to the front proxy instead of streaming it.
+
+    In "x-accel-redirect" mode nginx serves VIDEO_ACCEL_REDIRECT_PREFIX plus
+    the path relative to MEDIA_ROOT from an internal location; in
+    "x-sendfile" mode the proxy (Apache mod_xsendfile, lighttpd) gets the
+    absolute path. The proxy also handles Range requests.
+    """
+    response = HttpResponse(content_type=content_type)
+    if settings.VIDEO_DELIVERY_MODE == "x-sendfile":
+        response["X-Sendfile"] = os.fspath(path)
+    else:
+        relative_path = os.path.relpath(path, settings.MEDIA_ROOT)
+        response["X-Accel-Redirect"] = iri_to_uri(
+            settings.VIDEO_ACCEL_REDIRECT_PREFIX + relative_path.replace(os.sep, "/"))
+    return response
+
+
+def playlist_response(request, body, cache_control=None):
+    """
+    Serves a generated playlist body with an ETag and conditional GET support.
+    """
+    etag = f'"{hashlib.md5(body.encode(), usedforsecurity=False).hexdigest()}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type="application/vnd.apple.mpegurl")
+    response["ETag"] = etag
+    if cache_control:
+        response["Cache-Control"] = cache_control
+    return response
+
+
+def _validators_match_if_range(request, etag, last_modified):
+    """
+    Returns whether a Range request should be honoured under If-Range.
+    """
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _stat_file(path):
+    """
+    Returns the os.stat() result of a regular file, or raises Http404.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("File not found")
+    if not S_ISREG(stat.st_mode):
+        # e.g. a segment path resolving to a rendition directory
+        raise Http404("File not found")
+    return stat
+
+
+def file_response(request, path, content_type, cache_control=None, cache=None):
+    """
+    Serves a file with validators, conditional GET and byte-range support.
+
+    The ETag and Last-Modified headers are derived from the file mtime and
+    size; matching If-None-Match / If-Modified-Since requests get a 304.
+    A single byte range is answered with a 206 unless If-Range no longer
+    matches. Unless VIDEO_DELIVERY_MODE is "direct", the file itself is sent
+    by the front proxy and Django only returns the internal redirect header.
+    With a ByteLRUCache as cache, the bytes of
+    every served range small enough for it are kept in memory, keyed by the
+    path, ETag and range, and later requests for them skip the disk.
+    """
+    return _file_response(request, path, _stat_file(path), content_type,
+                          cache_control, cache, asynchronous=False)
+
+
+async def afile_response(request, path, content_type, cache_control=None,
+                         cache=None):
+    """
+    Async variant of file_response() for views running under ASGI.
+
+    The file is stat'ed in a thread and the body is streamed by an async
+    iterator, so the event loop never waits for the disk.
+    """
+    stat = await asyncio.to_thread(_stat_file, path)
+    return _file_response(request, path, stat, content_type, cache_control,
+                          cache, asynchronous=True)
+
+
+def _file_response(request, path, stat, content_type, cache_control, cache,
+                   asynchronous):
+    """
+    Builds the response of file_response() and afile_response() from the
+    stat of the file.
+    """
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    validators = {"ETag": etag, "Last-Modified": http_date(last_modified)}
+    if cache_control:
+        validators["Cache-Control"] = cache_control
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for header, value in validators.items():
+            response[header] = value
+        return response
+
+    if settings.VIDEO_DELIVERY_MODE != "direct":
+        response = offloaded_response(path, content_type)
+        for header, value in validators.items():
+            response[header] = value
+        return response
+
+    size = stat.st_size
+    try:
+        byte_range = parse_range(request.headers.get("Range"), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    if byte_range and not _validators_match_if_range(request, etag, last_modified):
+        byte_range = None
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1
+    cache_key = (os.fspath(path), etag, start, end)
+    cached = cache is not None and cache.accepts(length)
+    body = cache.get(cache_key) if cached else None
+    response_status = 206 if byte_range else 200
+
+    if body is not None:
+        response = HttpResponse(body, status=response_status,
+                                content_type=content_type)
+    elif byte_range is None and not asynchronous and not cached:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+    else:
+        if asynchronous:
+            chunks = aiter_file_range(path, start, length)
+            if cached:
+                chunks = _afilling_cache(chunks, cache, cache_key)
+        else:
+            chunks = iter_file_range(path, start, length)
+            if cached:
+                chunks = _filling_cache(chunks, cache, cache_key)
+        response = StreamingHttpResponse(
+            chunks, status=response_status, content_type=content_type)
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    for header, value in validators.items():
+        response[header] = value
+    return response
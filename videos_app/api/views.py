@@ -1,76 +1,528 @@
+import base64
+import hashlib
+import json
 import os
 
-from rest_framework import generics
-from rest_framework.permissions import IsAuthenticated
-from django.http import FileResponse, Http404
+from rest_framework import generics, status
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import Http404, HttpResponse
 from django.conf import settings
-from videos_app.models import Video
-from videos_app.api.serializers import VideoSerializer
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.urls import reverse
+from django.utils._os import safe_join
+from redis.exceptions import LockError
+from videos_app.models import Video, VideoUpload
+from videos_app.api.cache import catalog_cache_key, get_master_body, get_playlist_body, get_video_uuid, segment_cache
+from videos_app.api.feed import render_home_feed
+from videos_app.api.play_stats import record_play, trending_video_ids
+from videos_app.api.pagination import SearchCursorPagination, VideoCursorPagination
+from videos_app.api.progress import get_progress
+from videos_app.api.search import search_videos
+from videos_app.api.serializers import VideoSerializer, VideoUploadSerializer, WatchProgressSerializer
+from videos_app.api.signing import sign_playlist, sign_video, signed_expiry, verify_video_signature
+from videos_app.api.uploads import upload_lock
+from videos_app.api.watch_progress import get_watch_progress, save_watch_progress
+from videos_app.api.utils import file_response, playlist_response, truncate_file, write_chunk
+
+
+SEGMENT_CONTENT_TYPES = {
+    '.ts': 'video/MP2T',
+    '.mp4': 'video/mp4',
+    '.m4s': 'video/iso.segment',
+    '.jpg': 'image/jpeg',
+    '.vtt': 'text/vtt',
+}
+
+
+def rewrite_master_playlist(body, movie_id):
+    """
+    Points the variant URIs of a master playlist at the playlist API route.
+    """
+    lines = []
+    for line in body.splitlines():
+        if line and not line.startswith("#"):
+            line = reverse("hls-playlist", kwargs={
+                "movie_id": movie_id, "resolution": line.split("/")[0]})
+        lines.append(line)
+    return "\n".join(lines) + "\n"
 
 
 class VideosListView(generics.ListAPIView):
     """
-    View to list all videos.
+    View to list videos, newest first, in cursor-paginated pages.
+
+    Pass ?status=ready to only list videos that can be played and
+    ?category=<name> to list a single category; follow the "next" link for
+    the following page. Pages are cached in Redis until any video changes
+    and revalidated by clients with their ETag.
     """
-    queryset = Video.objects.all()
     serializer_class = VideoSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = VideoCursorPagination
+
+    def get_queryset(self):
+        """
+        Returns all videos, optionally filtered by status and category.
+        """
+        queryset = Video.objects.defer("search_vector")
+        status_filter = self.request.query_params.get("status")
+        if status_filter in Video.Status.values:
+            queryset = queryset.filter(status=status_filter)
+        category = self.request.query_params.get("category")
+        if category:
+            queryset = queryset.filter(category=category)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Returns a page from the cache, or renders and caches it.
+        """
+        key = catalog_cache_key(request)
+        page = cache.get(key)
+        if page is None:
+            data = super().list(request, *args, **kwargs).data
+            digest = hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode(),
+                                 usedforsecurity=False).hexdigest()
+            page = {"data": data, "etag": f'"{digest}"'}
+            cache.set(key, page, settings.VIDEO_CATALOG_CACHE_TIMEOUT)
+
+        response = get_conditional_response(request, etag=page["etag"])
+        if response is None:
+            response = Response(page["data"])
+        response["ETag"] = page["etag"]
+        response["Cache-Control"] = settings.VIDEO_CATALOG_CACHE_CONTROL
+        return response
+
+
+class VideoSearchView(generics.ListAPIView):
+    """
+    View to search ready videos by title, category and description.
+
+    Every word of ?q= matches as a prefix, and titles similar to it match
+    despite typos. Results are ordered by relevance and paginated by
+    cursor like the catalog.
+    """
+    serializer_class = VideoSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = SearchCursorPagination
+
+    def get_queryset(self):
+        """
+        Returns the matching videos annotated with their relevance score.
+        """
+        return search_videos(self.request.query_params.get("q", ""))
+
+    def list(self, request, *args, **kwargs):
+        """
+        Rejects requests without a search term.
+        """
+        if not request.query_params.get("q", "").strip():
+            return Response({"detail": "The q parameter is required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
+
+
+class HomeFeedView(APIView):
+    """
+    View to retrieve the home screen rows: the newest videos per category.
+
+    The feed is precomputed by rebuild_home_feed and its body cached per
+    site, so a request usually reads only the snapshot version and the
+    body from Redis; clients revalidate it with its ETag.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Returns the current home feed snapshot.
+        """
+        feed = render_home_feed(request)
+        response = get_conditional_response(request, etag=feed["etag"])
+        if response is None:
+            response = HttpResponse(feed["body"],
+                                    content_type="application/json")
+        response["ETag"] = feed["etag"]
+        response["Cache-Control"] = settings.VIDEO_CATALOG_CACHE_CONTROL
+        return response
+
+
+class TrendingView(APIView):
+    """
+    View to retrieve the videos played most in recent hours.
+
+    The ranking is read from a Redis sorted set of time-decayed play
+    counts, which record_play keeps up to date.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Returns the trending ready videos, the highest ranked first.
+        """
+        limit = settings.VIDEO_TRENDING_LIMIT
+        # Fetch extra ids in case some videos are no longer ready.
+        video_ids = trending_video_ids(limit * 2)
+        videos = Video.objects.defer("search_vector").filter(
+            status=Video.Status.READY).in_bulk(video_ids)
+        trending = [videos[video_id] for video_id in video_ids
+                    if video_id in videos][:limit]
+        return Response(VideoSerializer(
+            trending, many=True, context={"request": request}).data)
+
+
+class WatchProgressView(APIView):
+    """
+    View to save and retrieve the playback position of a video.
+
+    Players report their position every few seconds; the position is kept
+    in Redis and flushed to the database in bulk periodically.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, movie_id):
+        """
+        Returns the saved position to resume playback from.
+        """
+        if get_video_uuid(movie_id) is None:
+            raise Http404("Video not found")
+        position, duration, _ = get_watch_progress(request.user.pk).get(
+            movie_id, (0.0, 0.0, None))
+        return Response({"id": movie_id, "position": position,
+                         "duration": duration})
+
+    def put(self, request, movie_id):
+        """
+        Saves the current playback position.
+        """
+        if get_video_uuid(movie_id) is None:
+            raise Http404("Video not found")
+        serializer = WatchProgressSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        save_watch_progress(request.user.pk, movie_id,
+                            serializer.validated_data["position"],
+                            serializer.validated_data["duration"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ContinueWatchingView(APIView):
+    """
+    View to list the videos a user started but did not finish.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Returns the most recently watched unfinished videos with their
+        positions, newest first.
+        """
+        progress = [
+            (updated_at, video_id, position, duration)
+            for video_id, (position, duration, updated_at)
+            in get_watch_progress(request.user.pk).items()
+            if 0 < position < duration * settings.VIDEO_WATCH_COMPLETE_RATIO
+        ]
+        progress.sort(reverse=True)
+        progress = progress[:settings.VIDEO_CONTINUE_WATCHING_LIMIT]
+        videos = Video.objects.defer("search_vector").filter(
+            status=Video.Status.READY).in_bulk([entry[1] for entry in progress])
+        context = {"request": request}
+        return Response([
+            {"video": VideoSerializer(videos[video_id], context=context).data,
+             "position": position,
+             "duration": duration}
+            for _, video_id, position, duration in progress if video_id in videos
+        ])
 
 
-class HLSPlaylistView(generics.RetrieveAPIView):
+class VideoStatusView(APIView):
+    """
+    View to retrieve the processing status and transcoding progress of a video.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, movie_id):
+        """
+        Returns the status and the per-rendition progress in percent.
+        """
+        video_status = Video.objects.filter(
+            pk=movie_id).values_list("status", flat=True).first()
+        if video_status is None:
+            raise Http404("Video not found")
+        progress = (get_progress(movie_id)
+                    if video_status == Video.Status.TRANSCODING else {})
+        return Response({
+            "id": movie_id,
+            "status": video_status,
+            "progress": progress
+        })
+
+
+class HLSMasterPlaylistView(APIView):
+    """
+    View to retrieve the master playlist listing every rendition of a video.
+
+    Only available once the video is ready; the variant URIs point at
+    HLSPlaylistView. Players fetch it once per playback, so every request
+    is counted as a play in Redis.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, movie_id):
+        """
+        Retrieve the master playlist of a video.
+        """
+        video_uuid = get_video_uuid(movie_id)
+        if video_uuid is None:
+            raise Http404("Video not found")
+        body = get_master_body(video_uuid)
+        if body is None:
+            raise Http404("Playlist not found")
+        record_play(movie_id, request.user.pk)
+        return playlist_response(request, rewrite_master_playlist(body, movie_id),
+                                 settings.VIDEO_PLAYLIST_CACHE_CONTROL)
+
+
+class HLSPlaylistView(APIView):
     """
     View to retrieve the HLS playlist for a specific video and resolution.
+
+    Segment URIs are rewritten into short-lived signed URLs served by
+    SignedSegmentView, so segment requests need no JWT or database work.
+    The video uuid and playlist body come from the two-level video cache.
+    Playlists are cached briefly and revalidated with their ETag.
     """
-    queryset = Video.objects.all()
-    lookup_field = "id"
-    lookup_url_kwarg = "movie_id"
     permission_classes = [IsAuthenticated]
 
-    def retrieve(self, request, *args, **kwargs):
+    def get(self, request, movie_id, resolution):
         """
         Retrieve the HLS playlist for a specific video and resolution.
         """
-        video = self.get_object()
-        resolution = kwargs.get("resolution")
-        playlist_path = os.path.join(
-            settings.MEDIA_ROOT,
-            'videos',
-            str(video.uuid),
-            resolution,
-            'index.m3u8'
-        )
-
-        if not os.path.exists(playlist_path):
+        video_uuid = get_video_uuid(movie_id)
+        if video_uuid is None:
+            raise Http404("Video not found")
+        body = get_playlist_body(video_uuid, resolution)
+        if body is None:
             raise Http404("Playlist not found")
 
-        return FileResponse(open(playlist_path, 'rb'), content_type='application/vnd.apple.mpegurl')
+        expires = signed_expiry()
+        prefix = reverse("hls-signed-segment", kwargs={
+            "video_uuid": video_uuid,
+            "expires": expires,
+            "signature": sign_video(video_uuid, expires),
+            "resolution": resolution,
+            "segment": "_"
+        })[:-1]
+        return playlist_response(request, sign_playlist(body, prefix),
+                                 settings.VIDEO_PLAYLIST_CACHE_CONTROL)
 
 
-class HLSSegmentView(generics.RetrieveAPIView):
+class HLSSegmentView(APIView):
     """
     View to retrieve a specific HLS segment for a video.
+
+    Single-file fMP4 renditions are served by byte range. Segments never
+    change once written, so they are cacheable for a year. Also serves the
+    trickplay sprite sheets and their WebVTT index.
     """
-    queryset = Video.objects.all()
-    lookup_field = "id"
-    lookup_url_kwarg = "movie_id"
     permission_classes = [IsAuthenticated]
 
-    def retrieve(self, request, *args, **kwargs):
+    def get(self, request, movie_id, resolution, segment):
         """
         Retrieve a specific HLS segment for a video.
         """
-        video = self.get_object()
-        resolution = kwargs.get("resolution")
-        segment = kwargs.get("segment")
-        segment_path = os.path.join(
-            settings.MEDIA_ROOT,
-            'videos',
-            str(video.uuid),
-            resolution,
-            segment
-        )
-
-        if not os.path.exists(segment_path):
+        video_uuid = get_video_uuid(movie_id)
+        if video_uuid is None:
+            raise Http404("Video not found")
+        try:
+            segment_path = safe_join(
+                settings.MEDIA_ROOT, 'videos', str(video_uuid), resolution,
+                segment)
+        except SuspiciousFileOperation:
+            raise Http404("Segment not found")
+
+        content_type = SEGMENT_CONTENT_TYPES.get(
+            os.path.splitext(segment)[1], 'application/octet-stream')
+        return file_response(request, segment_path, content_type,
+                             settings.VIDEO_SEGMENT_CACHE_CONTROL,
+                             cache=segment_cache)
+
+
+class VideoUploadCreateView(generics.CreateAPIView):
+    """
+    View to start a resumable upload of a video source file.
+    """
+    queryset = VideoUpload.objects.all()
+    serializer_class = VideoUploadSerializer
+    permission_classes = [IsAdminUser]
+
+
+class VideoUploadView(APIView):
+    """
+    View to query and append chunks of a resumable video upload.
+
+    Chunks are sent as raw PATCH bodies with an Upload-Offset header matching
+    the current offset and an Upload-Checksum header of the form
+    "sha256 <base64 digest>". They are streamed straight into the final file,
+    so memory use does not depend on the file size. The Video is created, and
+    its transcoding started, once the last byte has arrived.
+
+    A Redis lock lets one request at a time write to an upload. No database
+    transaction is held while the body arrives; the new offset is stored
+    with a conditional UPDATE once the chunk has been verified.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, upload_id):
+        """
+        Returns the current offset so an interrupted upload can resume.
+        """
+        upload = get_object_or_404(VideoUpload, uuid=upload_id)
+        return self.upload_response(upload)
+
+    def patch(self, request, upload_id):
+        """
+        Appends one checksummed chunk at the current offset.
+        """
+        algorithm, _, checksum = request.headers.get(
+            "Upload-Checksum", "").partition(" ")
+        if algorithm != "sha256" or not checksum:
+            return Response({
+                "detail": "Upload-Checksum header with a sha256 digest is required."
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        lock = upload_lock(upload_id)
+        if not lock.acquire(blocking=False):
+            return Response(
+                {"detail": "Another chunk of this upload is being written."},
+                status=status.HTTP_409_CONFLICT)
+        try:
+            return self.append_chunk(request, upload_id, checksum, lock)
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                # Expired while the client stalled; a retry may hold it now.
+                pass
+
+    def append_chunk(self, request, upload_id, checksum, lock):
+        """
+        Writes the request body at the upload offset while holding lock.
+
+        The lock is renewed before every block; if it has expired, another
+        request may be writing and the chunk is abandoned.
+        """
+        upload = get_object_or_404(VideoUpload, uuid=upload_id)
+        if upload.video_id or upload.offset == upload.size:
+            return Response({"detail": "Upload already completed."},
+                            status=status.HTTP_409_CONFLICT)
+        if request.headers.get("Upload-Offset") != str(upload.offset):
+            return self.upload_response(upload, status.HTTP_409_CONFLICT)
+
+        path = default_storage.path(upload.file_name)
+        try:
+            written, digest = write_chunk(
+                path, upload.offset, request.stream, upload.size - upload.offset,
+                before_write=lock.reacquire)
+        except LockError:
+            return Response({"detail": "Upload lock expired, resend the chunk."},
+                            status=status.HTTP_409_CONFLICT)
+        if upload.offset + written > upload.size:
+            truncate_file(path, upload.offset)
+            return Response({"detail": "Chunk exceeds the upload size."},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if base64.b64encode(digest).decode() != checksum:
+            truncate_file(path, upload.offset)
+            return Response({"detail": "Checksum mismatch."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        offset = upload.offset + written
+        with transaction.atomic():
+            video = None
+            if offset == upload.size:
+                video = Video.objects.create(
+                    uuid=upload.uuid,
+                    title=upload.title,
+                    description=upload.description,
+                    thumbnail_url=upload.thumbnail.name,
+                    category=upload.category,
+                    video_file=upload.file_name
+                )
+            updated = VideoUpload.objects.filter(
+                pk=upload.pk, offset=upload.offset, video=None
+            ).update(offset=offset, video=video, updated_at=timezone.now())
+            if not updated:
+                transaction.set_rollback(True)
+                upload.refresh_from_db()
+                return self.upload_response(upload, status.HTTP_409_CONFLICT)
+        upload.offset = offset
+        upload.video = video
+        return self.upload_response(upload)
+
+    def upload_response(self, upload, status_code=status.HTTP_200_OK):
+        """
+        Builds the response describing the state of an upload.
+        """
+        response = Response({
+            "id": upload.uuid,
+            "offset": upload.offset,
+            "size": upload.size,
+            "video_id": upload.video_id
+        }, status=status_code)
+        response["Upload-Offset"] = str(upload.offset)
+        response["Upload-Length"] = str(upload.size)
+        return response
+
+
+class SignedSegmentView(APIView):
+    """
+    View to serve HLS segments from signed URLs handed out in playlists.
+
+    The signature covers the video uuid and the expiry, so the request is
+    verified without authentication or any database access.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, video_uuid, expires, signature, resolution, segment):
+        """
+        Serve a segment if its URL signature is valid and not expired.
+        """
+        if not verify_video_signature(video_uuid, expires, signature):
+            return Response({"detail": "Invalid or expired segment URL."},
+                            status=status.HTTP_403_FORBIDDEN)
+        try:
+            segment_path = safe_join(
+                settings.MEDIA_ROOT, 'videos', str(video_uuid), resolution,
+                segment)
+        except SuspiciousFileOperation:
             raise Http404("Segment not found")
 
-        return FileResponse(open(segment_path, 'rb'), content_type='video/MP2T')
+        content_type = SEGMENT_CONTENT_TYPES.get(
+            os.path.splitext(segment)[1], 'application/octet-stream')
+        return file_response(request, segment_path, content_type,
+                             settings.VIDEO_SIGNED_SEGMENT_CACHE_CONTROL,
+                             cache=segment_cache)
+
+
+class SegmentCacheStatsView(APIView):
+    """
+    View to monitor the in-memory segment cache of the answering process.
+
+    Every web worker process has its own cache, so the pid is included to
+    tell the workers apart.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Returns the size, hit ratio and eviction count of the segment cache.
+        """
+        return Response({"pid": os.getpid(), **segment_cache.stats()})
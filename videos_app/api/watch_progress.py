@@ -0,0 +1,113 @@
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from videos_app.models import WatchProgress
+
+
+WATCH_PROGRESS_DIRTY_KEY = "videoflix:watch-progress-dirty"
+LOADED_FIELD = b"loaded"
+
+
+def _watch_progress_key(user_id):
+    """
+    Returns the Redis hash key holding the playback positions of a user.
+    """
+    return f"videoflix:watch-progress:{user_id}"
+
+
+def _encode(position, duration, updated_at):
+    return f"{position}:{duration}:{updated_at}"
+
+
+def _decode(value):
+    position, duration, updated_at = value.decode().split(":")
+    return float(position), float(duration), float(updated_at)
+
+
+def save_watch_progress(user_id, video_id, position, duration):
+    """
+    Store the playback position of a video for a user in Redis only.
+
+    The entry is marked dirty and written to Postgres by the next
+    flush_watch_progress run, however often it changes until then.
+    """
+    key = _watch_progress_key(user_id)
+    redis = get_redis_connection("default")
+    with redis.pipeline() as pipe:
+        pipe.hset(key, video_id, _encode(position, duration, time.time()))
+        pipe.expire(key, settings.VIDEO_WATCH_PROGRESS_TTL)
+        pipe.sadd(WATCH_PROGRESS_DIRTY_KEY, f"{user_id}:{video_id}")
+        pipe.execute()
+
+
+def _load_watch_progress(user_id, values):
+    """
+    Merges the stored positions of a user into the Redis hash.
+
+    Positions already in Redis were written after the hash was created,
+    so they win over the database rows.
+    """
+    stored = {
+        str(progress.video_id).encode(): _encode(
+            progress.position, progress.duration,
+            progress.updated_at.timestamp()).encode()
+        for progress in WatchProgress.objects.filter(user_id=user_id)
+    }
+    key = _watch_progress_key(user_id)
+    redis = get_redis_connection("default")
+    with redis.pipeline() as pipe:
+        for video_id, value in stored.items():
+            pipe.hsetnx(key, video_id, value)
+        pipe.hset(key, LOADED_FIELD, 1)
+        pipe.expire(key, settings.VIDEO_WATCH_PROGRESS_TTL)
+        pipe.execute()
+    return {**stored, **values}
+
+
+def get_watch_progress(user_id):
+    """
+    Returns {video_id: (position, duration, updated_at)} of a user.
+
+    Served from Redis; the database is only read when the hash of the
+    user has not been loaded from it since it last expired.
+    """
+    values = get_redis_connection("default").hgetall(
+        _watch_progress_key(user_id))
+    if LOADED_FIELD not in values:
+        values = _load_watch_progress(user_id, values)
+    values.pop(LOADED_FIELD, None)
+    return {int(video_id): _decode(value) for video_id, value in values.items()}
+
+
+def pop_dirty_watch_progress(count):
+    """
+    Removes up to count dirty entries from the dirty set.
+
+    Returns the removed set members and the current values of the entries
+    as (user_id, video_id, position, duration, updated_at) tuples.
+    """
+    redis = get_redis_connection("default")
+    members = redis.spop(WATCH_PROGRESS_DIRTY_KEY, count)
+    if not members:
+        return [], []
+    pairs = [tuple(int(part) for part in member.split(b":"))
+             for member in members]
+    with redis.pipeline() as pipe:
+        for user_id, video_id in pairs:
+            pipe.hget(_watch_progress_key(user_id), video_id)
+        values = pipe.execute()
+    entries = [
+        (user_id, video_id, *_decode(value))
+        for (user_id, video_id), value in zip(pairs, values) if value
+    ]
+    return members, entries
+
+
+def mark_watch_progress_dirty(members):
+    """
+    Puts entries back into the dirty set after a failed flush.
+    """
+    if members:
+        get_redis_connection("default").sadd(WATCH_PROGRESS_DIRTY_KEY, *members)
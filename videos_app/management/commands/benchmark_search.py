@@ -0,0 +1,161 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from videos_app.api.cache import bump_catalog_version
+from videos_app.api.feed import rebuild_home_feed
+from videos_app.api.search import search_videos, video_search_vector
+from videos_app.management.commands.loadtest_hls import latency_summary
+from videos_app.models import Video
+
+
+CATEGORIES = ["Action", "Comedy", "Documentary", "Drama", "Family", "Horror",
+              "Romance", "Science Fiction", "Thriller", "Western"]
+SYLLABLES = ["ka", "lo", "mer", "tin", "sa", "vor", "el", "dra", "quin", "bel",
+             "stor", "ra", "nov", "ish", "gan", "tor", "lu", "ven", "mi", "cas"]
+
+
+def make_vocabulary(rng, size):
+    """
+    Returns size distinct pronounceable pseudo-words.
+    """
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_typo(rng, word):
+    """
+    Swaps two neighbouring letters of a word.
+    """
+    index = rng.randrange(len(word) - 1)
+    return word[:index] + word[index + 1] + word[index] + word[index + 2:]
+
+
+class Command(BaseCommand):
+    """
+    Seeds a synthetic catalog and measures search latency on it.
+    """
+    help = ("Seed synthetic videos, run exact, prefix, multi-word and typo "
+            "searches against them and write a JSON report.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--videos", type=int, default=100_000,
+                            help="Number of synthetic videos to seed.")
+        parser.add_argument("--repeat", type=int, default=50,
+                            help="Searches per query kind.")
+        parser.add_argument("--page-size", type=int, default=24)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--keep", action="store_true",
+                            help="Keep the seeded videos afterwards.")
+        parser.add_argument("--explain", action="store_true",
+                            help="Print the query plan of one search per kind.")
+        parser.add_argument("--output", help="Write the JSON report here.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        vocabulary = make_vocabulary(rng, 5000)
+        seeded_ids = self.seed(rng, vocabulary, options["videos"])
+        try:
+            catalog_size = Video.objects.count()
+            queries = self.make_queries(rng, vocabulary, options["repeat"])
+            results = {kind: self.measure(kind, texts, options)
+                       for kind, texts in queries.items()}
+        finally:
+            if not options["keep"]:
+                self.remove(seeded_ids)
+
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "catalog_size": catalog_size,
+            "results": results,
+        }
+        for kind, result in results.items():
+            latency = result["latency_ms"]
+            self.stdout.write(
+                f"{kind:<10} p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+                f"p99 {latency['p99']} ms, {result['average_hits']:.1f} hits/page")
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f"Report written to {options['output']}"))
+
+    def seed(self, rng, vocabulary, count, batch_size=5000):
+        """
+        Bulk creates ready videos with random titles and descriptions.
+
+        bulk_create sends no signals, so no transcoding is started; the
+        search vectors are filled afterwards. Returns the ids of the seeded
+        videos.
+        """
+        self.stdout.write(f"Seeding {count} videos")
+        ids = []
+        for offset in range(0, count, batch_size):
+            videos = Video.objects.bulk_create([
+                Video(
+                    title=" ".join(rng.sample(vocabulary, rng.randint(1, 4))).title(),
+                    description=" ".join(rng.choices(vocabulary, k=rng.randint(10, 30))),
+                    category=rng.choice(CATEGORIES),
+                    status=Video.Status.READY,
+                )
+                for _ in range(min(batch_size, count - offset))
+            ])
+            Video.objects.filter(pk__in=[video.pk for video in videos]).update(
+                search_vector=video_search_vector())
+            ids += [video.pk for video in videos]
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Video._meta.db_table}")
+        return ids
+
+    def remove(self, ids, batch_size=5000):
+        """
+        Deletes exactly the seeded videos, one statement per batch.
+
+        Videos created by anyone else meanwhile are left alone. The delete
+        bypasses post_delete, which would enqueue a file cleanup job for
+        every video, because seeded videos have no files.
+        """
+        self.stdout.write("Removing the seeded videos")
+        with connection.cursor() as cursor:
+            for offset in range(0, len(ids), batch_size):
+                cursor.execute(
+                    f"DELETE FROM {Video._meta.db_table} WHERE id = ANY(%s)",
+                    [ids[offset:offset + batch_size]])
+        bump_catalog_version()
+        rebuild_home_feed()
+
+    def make_queries(self, rng, vocabulary, repeat):
+        """
+        Returns the search texts to run for every query kind.
+        """
+        words = [rng.choice(vocabulary) for _ in range(repeat * 2)]
+        return {
+            "exact": words[:repeat],
+            "prefix": [word[:4] for word in words[:repeat]],
+            "two_words": [f"{a} {b}" for a, b in zip(words[:repeat], words[repeat:])],
+            "typo": [make_typo(rng, word) for word in words[:repeat]],
+        }
+
+    def measure(self, kind, texts, options):
+        """
+        Fetches the first result page of every text and times it.
+        """
+        seconds = []
+        hits = 0
+        for text in texts:
+            queryset = search_videos(text).order_by("-score", "-id")[:options["page_size"]]
+            started = time.perf_counter()
+            page = list(queryset)
+            seconds.append(time.perf_counter() - started)
+            hits += len(page)
+        if options["explain"]:
+            self.stdout.write(f"\n{kind} ({texts[0]!r}):\n"
+                              + search_videos(texts[0]).order_by("-score", "-id")[
+                                  :options["page_size"]].explain(analyze=True))
+        return {"latency_ms": latency_summary(seconds),
+                "average_hits": hits / len(texts)}
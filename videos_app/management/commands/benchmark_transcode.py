@@ -0,0 +1,198 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from videos_app.api.tasks import convert_video_to_hls, probe_video, select_resolutions, transcode_video
+
+
+def _directory_bytes(path):
+    """
+    Returns the total size of all files below path.
+    """
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+def generate_source(directory, width, height, duration):
+    """
+    Render a synthetic lavfi test pattern with a sine tone to an MP4 file.
+    """
+    path = os.path.join(directory, f"testsrc_{width}x{height}_{duration}s.mp4")
+    if not os.path.exists(path):
+        subprocess.run([
+            "ffmpeg", "-v", "error",
+            "-f", "lavfi", "-i",
+            f"testsrc2=size={width}x{height}:rate=30:duration={duration}",
+            "-f", "lavfi", "-i", f"sine=frequency=1000:duration={duration}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-crf", "18",
+            "-c:a", "aac", "-shortest", path
+        ], check=True)
+    return path
+
+
+def run_case(source, mode, connection):
+    """
+    Transcode one source in one mode and send the measurements back.
+
+    Runs in a forked process so the child rusage (CPU time and peak RSS of
+    the ffmpeg processes) covers this case only.
+    """
+    probe = probe_video(source)
+    resolutions = select_resolutions(probe)
+    with tempfile.TemporaryDirectory() as output_dir:
+        wall_start = time.perf_counter()
+        if mode == "separate":
+            for resolution in resolutions:
+                convert_video_to_hls(source, resolution, output_dir)
+        else:
+            transcode_video(source, output_dir, resolutions)
+        wall = time.perf_counter() - wall_start
+
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        connection.send({
+            "source": os.path.basename(source),
+            "mode": mode,
+            "resolution": f"{probe['width']}x{probe['height']}",
+            "duration": probe["duration"],
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+            "realtime_factor": round(probe["duration"] / wall, 3),
+            "peak_rss_kb": usage.ru_maxrss,
+            "bytes": {
+                f"{resolution}p": _directory_bytes(
+                    os.path.join(output_dir, f"{resolution}p"))
+                for resolution in resolutions
+            },
+        })
+
+
+class Command(BaseCommand):
+    """
+    Measures transcoding throughput and output size, without Redis.
+    """
+    help = ("Benchmark the transcoding tasks on given or synthetic sources "
+            "and write a JSON report.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("sources", nargs="*",
+                            help="Source videos; synthetic sources if omitted.")
+        parser.add_argument("--sizes", nargs="+",
+                            default=["640x360", "1280x720", "1920x1080"],
+                            help="Synthetic source sizes as WIDTHxHEIGHT.")
+        parser.add_argument("--durations", nargs="+", type=int, default=[10, 60],
+                            help="Synthetic source durations in seconds.")
+        parser.add_argument("--modes", nargs="+", default=["single"],
+                            choices=["single", "separate"],
+                            help="single: one decode for all renditions, "
+                                 "separate: one ffmpeg run per rendition.")
+        parser.add_argument("--output", help="Write the JSON report here.")
+        parser.add_argument("--compare", help="Previous JSON report to diff against.")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as source_dir:
+            sources = options["sources"] or self.synthetic_sources(
+                source_dir, options["sizes"], options["durations"])
+            for source in sources:
+                if not os.path.exists(source):
+                    raise CommandError(f"{source} not found")
+
+            results = [self.measure(source, mode)
+                       for source in sources for mode in options["modes"]]
+
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "machine": {"platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+            "settings": {
+                "segment_format": settings.VIDEO_HLS_SEGMENT_FORMAT,
+                "threads": settings.VIDEO_TRANSCODE_THREADS,
+            },
+            "results": results,
+        }
+        self.print_results(results)
+        if options["compare"]:
+            self.print_comparison(results, options["compare"])
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f"Report written to {options['output']}"))
+
+    def synthetic_sources(self, directory, sizes, durations):
+        """
+        Renders every size/duration combination of synthetic test sources.
+        """
+        sources = []
+        for size in sizes:
+            width, height = (int(value) for value in size.lower().split("x"))
+            for duration in durations:
+                self.stdout.write(f"Generating {size} {duration}s test source")
+                sources.append(generate_source(directory, width, height, duration))
+        return sources
+
+    def measure(self, source, mode):
+        """
+        Runs one benchmark case in a forked process and returns its result.
+        """
+        self.stdout.write(f"Transcoding {os.path.basename(source)} ({mode})")
+        context = multiprocessing.get_context("fork")
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=run_case, args=(source, mode, sender))
+        process.start()
+        sender.close()
+        try:
+            result = receiver.recv()
+        except EOFError:
+            raise CommandError(f"Transcoding {source} ({mode}) failed")
+        process.join()
+        return result
+
+    def print_results(self, results):
+        """
+        Prints one line per benchmark case.
+        """
+        self.stdout.write(
+            f"{'source':<32}{'mode':<10}{'wall s':>9}{'cpu s':>9}"
+            f"{'x rt':>8}{'rss MB':>9}{'MB out':>9}")
+        for result in results:
+            self.stdout.write(
+                f"{result['source']:<32}{result['mode']:<10}"
+                f"{result['wall_seconds']:>9.2f}{result['cpu_seconds']:>9.2f}"
+                f"{result['realtime_factor']:>8.2f}"
+                f"{result['peak_rss_kb'] / 1024:>9.1f}"
+                f"{sum(result['bytes'].values()) / 1024 / 1024:>9.1f}")
+
+    def print_comparison(self, results, path):
+        """
+        Prints the relative change of every case found in a previous report.
+        """
+        with open(path) as f:
+            previous = {(result["source"], result["mode"]): result
+                        for result in json.load(f)["results"]}
+
+        self.stdout.write(f"\nChange against {path}:")
+        for result in results:
+            before = previous.get((result["source"], result["mode"]))
+            if not before:
+                continue
+            changes = []
+            for key in ("wall_seconds", "cpu_seconds", "peak_rss_kb"):
+                if before[key]:
+                    changes.append(
+                        f"{key} {(result[key] / before[key] - 1) * 100:+.1f}%")
+            before_bytes = sum(before["bytes"].values())
+            if before_bytes:
+                changes.append(
+                    f"bytes {(sum(result['bytes'].values()) / before_bytes - 1) * 100:+.1f}%")
+            self.stdout.write(
+                f"{result['source']} ({result['mode']}): {', '.join(changes)}")
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from videos_app.api.tasks import generate_master_playlist, probe_video, select_resolutions, transcode_video
+from videos_app.management.commands.benchmark_transcode import generate_source
+from videos_app.models import Video
+
+
+class Command(BaseCommand):
+    """
+    Creates an active user and a transcoded synthetic video for load tests.
+    """
+    help = ("Create a ready synthetic HLS video and a login for "
+            "loadtest_playback, without Redis or RQ workers.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", default="loadtest@example.com")
+        parser.add_argument("--password", default="loadtest-password")
+        parser.add_argument("--title", default="Load test fixture")
+        parser.add_argument("--size", default="1280x720",
+                            help="Source size as WIDTHxHEIGHT.")
+        parser.add_argument("--duration", type=int, default=120,
+                            help="Source duration in seconds.")
+        parser.add_argument("--force", action="store_true",
+                            help="Transcode a new video even if one exists.")
+
+    def handle(self, *args, **options):
+        self.create_user(options["email"], options["password"])
+
+        video = Video.objects.filter(
+            title=options["title"], status=Video.Status.READY).first()
+        if video is None or options["force"]:
+            video = self.create_video(options)
+        else:
+            self.stdout.write(f"Reusing video {video.pk}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Fixture ready: video {video.pk}, login {options['email']}"))
+        self.stdout.write(
+            f"python manage.py loadtest_playback http://localhost:8080 "
+            f"--video {video.pk} --email {options['email']} "
+            f"--password {options['password']}")
+
+    def create_user(self, email, password):
+        """
+        Creates or reactivates the load test user with the given password.
+        """
+        User = get_user_model()
+        user = User.objects.filter(email=email).first() or User(
+            email=email, username=email)
+        user.is_active = True
+        user.set_password(password)
+        user.save()
+
+    def create_video(self, options):
+        """
+        Renders and transcodes a synthetic source straight into a new video
+        folder.
+
+        The Video row is added with bulk_create, which sends no signals, so
+        the RQ pipeline is not started for it.
+        """
+        width, height = (int(value) for value in options["size"].lower().split("x"))
+        video_uuid = uuid.uuid4()
+        output_dir = os.path.join(settings.MEDIA_ROOT, "videos", str(video_uuid))
+        with tempfile.TemporaryDirectory() as source_dir:
+            self.stdout.write(
+                f"Generating {options['size']} {options['duration']}s test source")
+            source = generate_source(source_dir, width, height, options["duration"])
+            resolutions = select_resolutions(probe_video(source))
+            self.stdout.write(
+                f"Transcoding to {', '.join(f'{r}p' for r in resolutions)}")
+            transcode_video(source, output_dir, resolutions)
+        generate_master_playlist(output_dir)
+
+        video, = Video.objects.bulk_create([Video(
+            uuid=video_uuid,
+            title=options["title"],
+            description="Synthetic test pattern for load tests.",
+            category="loadtest",
+            status=Video.Status.READY,
+        )])
+        return video
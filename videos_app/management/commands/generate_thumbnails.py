@@ -0,0 +1,30 @@
+import django_rq
+
+from django.core.management.base import BaseCommand
+
+from videos_app.api.tasks import generate_thumbnail_derivatives
+from videos_app.models import Video
+
+
+class Command(BaseCommand):
+    """
+    Enqueues thumbnail variant generation for videos that have none yet.
+    """
+    help = "Generate resized thumbnail variants for existing videos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Regenerate variants for every video.")
+
+    def handle(self, *args, **options):
+        videos = Video.objects.exclude(thumbnail_url="")
+        if not options["all"]:
+            videos = videos.filter(thumbnail_derivatives={})
+
+        queue = django_rq.get_queue('maintenance', autocommit=True)
+        count = 0
+        for video_id in videos.values_list("pk", flat=True):
+            queue.enqueue(generate_thumbnail_derivatives, video_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Enqueued thumbnail variants for {count} videos."))
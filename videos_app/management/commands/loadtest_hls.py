@@ -0,0 +1,242 @@
+import asyncio
+import json
+import resource
+import ssl
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+FETCH_ERRORS = (OSError, ValueError, asyncio.TimeoutError,
+                asyncio.IncompleteReadError, asyncio.LimitOverrunError)
+
+
+def percentile(values, percent):
+    """
+    Returns the given percentile of a list of numbers, or None if empty.
+    """
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def latency_summary(seconds):
+    """
+    Returns the p50/p95/p99 of a list of durations in milliseconds.
+    """
+    return {f"p{percent}": round(percentile(seconds, percent) * 1000, 1)
+            if seconds else None for percent in (50, 95, 99)}
+
+
+def summarize(results, wall):
+    """
+    Aggregates status codes, errors, latency percentiles and throughput of
+    a list of fetch() results or {"error": name} dicts.
+    """
+    responses = [result for result in results if "error" not in result]
+    statuses, errors = {}, {}
+    for result in results:
+        if "error" in result:
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+        else:
+            statuses[str(result["status"])] = statuses.get(str(result["status"]), 0) + 1
+    failed = sum(errors.values()) + sum(
+        1 for result in responses if result["status"] >= 400)
+
+    received = sum(result["size"] for result in responses)
+    return {
+        "requests": len(results),
+        "statuses": statuses,
+        "errors": errors,
+        "error_rate": round(failed / len(results), 4) if results else None,
+        "first_byte_ms": latency_summary(
+            [result["first_byte"] for result in responses]),
+        "total_ms": latency_summary([result["total"] for result in responses]),
+        "bytes": received,
+        "throughput_mbit": round(received * 8 / wall / 1_000_000, 2),
+    }
+
+
+def raise_open_file_limit():
+    """
+    Raises the soft open file limit to the hard limit for many sockets.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def decode_chunked(body):
+    """
+    Returns the payload of a body sent with chunked transfer encoding.
+    """
+    payload = bytearray()
+    while body:
+        size_line, _, body = body.partition(b"\r\n")
+        size = int(size_line.split(b";")[0], 16)
+        if not size:
+            break
+        payload += body[:size]
+        body = body[size + 2:]
+    return bytes(payload)
+
+
+async def fetch(url, headers=None, rate=None, timeout=60, keep_body=False,
+                method="GET", body=None, chunk_size=16 * 1024):
+    """
+    Sends one HTTP/1.1 request over a raw asyncio connection and reads the
+    response.
+
+    With rate (bytes per second) the body is read no faster than that,
+    like a slow mobile client, so the server has to keep the connection
+    open. Returns the status, header dict, cookies, body size and timings,
+    plus the body itself if keep_body is set.
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    target = parts.path or "/"
+    if parts.query:
+        target += f"?{parts.query}"
+
+    started = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(
+        parts.hostname, port, ssl=ssl.create_default_context() if secure else None),
+        timeout)
+    try:
+        request = [f"{method} {target} HTTP/1.1", f"Host: {parts.netloc}",
+                   "Connection: close"]
+        request += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        if body is not None:
+            request.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(request) + "\r\n\r\n").encode() + (body or b""))
+        await writer.drain()
+
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        first_byte = time.perf_counter() - started
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        response_headers = {}
+        cookies = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            name, value = name.strip().lower(), value.strip()
+            if name == "set-cookie":
+                cookie, _, _ = value.partition(";")
+                cookie_name, _, cookie_value = cookie.partition("=")
+                cookies[cookie_name.strip()] = cookie_value.strip()
+            elif name:
+                response_headers[name] = value
+
+        body = bytearray()
+        size = 0
+        read_start = time.perf_counter()
+        while True:
+            block = await asyncio.wait_for(reader.read(chunk_size), timeout)
+            if not block:
+                break
+            size += len(block)
+            if keep_body:
+                body += block
+            if rate:
+                delay = size / rate - (time.perf_counter() - read_start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+    finally:
+        writer.close()
+
+    if response_headers.get("transfer-encoding") == "chunked" and keep_body:
+        body = decode_chunked(bytes(body))
+    return {
+        "status": int(status_line.split()[1]),
+        "headers": response_headers,
+        "cookies": cookies,
+        "size": size,
+        "body": bytes(body),
+        "first_byte": first_byte,
+        "total": time.perf_counter() - started,
+    }
+
+
+class Command(BaseCommand):
+    """
+    Opens many concurrent slow connections to one HLS URL and reports latency.
+    """
+    help = ("Load test playlist or segment delivery with concurrent, "
+            "rate-limited clients and write a JSON report.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Playlist or segment URL to request.")
+        parser.add_argument("--clients", type=int, default=1000,
+                            help="Number of concurrent connections.")
+        parser.add_argument("--rate", type=int, default=64 * 1024,
+                            help="Read rate per client in bytes per second, "
+                                 "0 for unlimited.")
+        parser.add_argument("--ramp", type=float, default=5,
+                            help="Seconds over which the clients connect.")
+        parser.add_argument("--timeout", type=float, default=120,
+                            help="Seconds before a stalled request fails.")
+        parser.add_argument("--access-token",
+                            help="JWT sent as the access_token cookie.")
+        parser.add_argument("--output", help="Write the JSON report here.")
+
+    def handle(self, *args, **options):
+        if urlsplit(options["url"]).scheme not in ("http", "https"):
+            raise CommandError("The URL must start with http:// or https://")
+        limit = raise_open_file_limit()
+        if options["clients"] > limit - 50:
+            raise CommandError(
+                f"{options['clients']} clients exceed the open file limit of {limit}")
+
+        headers = {}
+        if options["access_token"]:
+            headers["Cookie"] = f"access_token={options['access_token']}"
+        results, wall = asyncio.run(self.run(options, headers))
+
+        report = {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                  "wall_seconds": round(wall, 3), **summarize(results, wall)}
+        report["settings"] = {key: options[key] for key in
+                              ("url", "clients", "rate", "ramp", "timeout")}
+        self.print_report(report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f"Report written to {options['output']}"))
+
+    async def run(self, options, headers):
+        """
+        Starts all clients spread over the ramp-up time and gathers them.
+        """
+        async def client(index):
+            await asyncio.sleep(options["ramp"] * index / options["clients"])
+            try:
+                return await fetch(options["url"], headers,
+                                   options["rate"] or None, options["timeout"])
+            except FETCH_ERRORS as exc:
+                return {"error": type(exc).__name__}
+
+        self.stdout.write(
+            f"Starting {options['clients']} clients against {options['url']}")
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(client(index) for index in range(options["clients"])))
+        return results, time.perf_counter() - started
+
+    def print_report(self, report):
+        """
+        Prints the summary of one load test run.
+        """
+        self.stdout.write(
+            f"Finished in {report['wall_seconds']:.1f}s, statuses "
+            f"{report['statuses']}, errors {report['errors']}")
+        for key in ("first_byte_ms", "total_ms"):
+            values = ", ".join(f"{name} {value}" for name, value in report[key].items())
+            self.stdout.write(f"{key}: {values}")
+        self.stdout.write(
+            f"Received {report['bytes'] / 1024 / 1024:.1f} MB "
+            f"({report['throughput_mbit']} Mbit/s)")
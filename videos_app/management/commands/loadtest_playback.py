@@ -0,0 +1,287 @@
+import asyncio
+import json
+import re
+import time
+from urllib.parse import urljoin, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from videos_app.management.commands.loadtest_hls import (
+    FETCH_ERRORS, fetch, raise_open_file_limit, summarize)
+
+
+ENDPOINTS = ["login", "master", "playlist", "init", "segment"]
+BYTERANGE_RE = re.compile(r'BYTERANGE[:=]"?(\d+)(?:@(\d+))?')
+
+
+def parse_master_playlist(body):
+    """
+    Returns (bandwidth, uri) pairs of the variants in a master playlist.
+    """
+    variants = []
+    bandwidth = None
+    for line in body.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            match = re.search(r"(?:^|[:,])BANDWIDTH=(\d+)", line)
+            bandwidth = int(match.group(1)) if match else 0
+        elif line and not line.startswith("#") and bandwidth is not None:
+            variants.append((bandwidth, line))
+            bandwidth = None
+    return variants
+
+
+def _range_header(match, offsets, uri):
+    """
+    Returns the Range header value of a BYTERANGE attribute, or None.
+    """
+    if not match:
+        return None
+    length = int(match.group(1))
+    start = int(match.group(2)) if match.group(2) else offsets.get(uri, 0)
+    offsets[uri] = start + length
+    return f"bytes={start}-{start + length - 1}"
+
+
+def parse_media_playlist(body):
+    """
+    Returns the init section and the (duration, uri, range) segments of a
+    media playlist; ranges are Range header values or None.
+    """
+    init = None
+    segments = []
+    offsets = {}
+    duration = None
+    byte_range = None
+    for line in body.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-MAP:"):
+            uri = re.search(r'URI="([^"]+)"', line).group(1)
+            init = (uri, _range_header(BYTERANGE_RE.search(line), offsets, uri))
+        elif line.startswith("#EXTINF:"):
+            duration = float(line[len("#EXTINF:"):].split(",")[0])
+        elif line.startswith("#EXT-X-BYTERANGE:"):
+            byte_range = BYTERANGE_RE.search(line)
+        elif line and not line.startswith("#") and duration is not None:
+            segments.append(
+                (duration, line, _range_header(byte_range, offsets, line)))
+            duration = None
+            byte_range = None
+    return init, segments
+
+
+class Command(BaseCommand):
+    """
+    Simulates viewers that play a video at real playback pace.
+    """
+    help = ("Load test the playback path: one login, then master and media "
+            "playlist and paced segment requests for N viewers, with a JSON "
+            "report per endpoint.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("base_url", help="Server URL, e.g. http://localhost:8080")
+        parser.add_argument("--video", type=int, required=True,
+                            help="Id of a ready video, see create_hls_fixture.")
+        parser.add_argument("--email", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--viewers", type=int, default=100,
+                            help="Number of simulated viewers.")
+        parser.add_argument("--ramp", type=float, default=10,
+                            help="Seconds over which the viewers start.")
+        parser.add_argument("--watch", type=float, default=60,
+                            help="Seconds of video every viewer plays.")
+        parser.add_argument("--buffer", type=float, default=30,
+                            help="Seconds a viewer buffers ahead of playback.")
+        parser.add_argument("--speed", type=float, default=1,
+                            help="Playback speed, above 1 to shorten the run.")
+        parser.add_argument("--rendition", default="highest",
+                            help="highest, lowest or a name such as 720p.")
+        parser.add_argument("--timeout", type=float, default=30,
+                            help="Seconds before a stalled request fails.")
+        parser.add_argument("--output", help="Write the JSON report here.")
+
+    def handle(self, *args, **options):
+        if urlsplit(options["base_url"]).scheme not in ("http", "https"):
+            raise CommandError("The URL must start with http:// or https://")
+        limit = raise_open_file_limit()
+        if options["viewers"] > limit - 50:
+            raise CommandError(
+                f"{options['viewers']} viewers exceed the open file limit of {limit}")
+
+        self.options = options
+        self.results = {endpoint: [] for endpoint in ENDPOINTS}
+        self.stalls = []
+        self.stdout.write(f"Starting {options['viewers']} viewers of video "
+                          f"{options['video']} at {options['base_url']}")
+        started = time.perf_counter()
+        completed = asyncio.run(self.run())
+        wall = time.perf_counter() - started
+
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "wall_seconds": round(wall, 3),
+            "settings": {key: options[key] for key in (
+                "base_url", "video", "viewers", "ramp", "watch", "buffer",
+                "speed", "rendition", "timeout")},
+            "viewers": {
+                "completed": completed,
+                "stalls": len(self.stalls),
+                "stall_seconds": round(sum(self.stalls), 3),
+            },
+            "endpoints": {endpoint: summarize(results, wall)
+                          for endpoint, results in self.results.items()
+                          if results},
+        }
+        self.print_report(report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f"Report written to {options['output']}"))
+
+    async def run(self):
+        """
+        Logs in, then starts all viewers spread over the ramp-up time and
+        returns how many of them played until the end.
+
+        The viewers share one login: they all use the same account, and
+        logins are throttled per email.
+        """
+        options = self.options
+        login = await self.request(
+            "login", urljoin(options["base_url"], "/api/login/"),
+            {"Content-Type": "application/json"}, method="POST",
+            body=json.dumps({"email": options["email"],
+                             "password": options["password"]}).encode())
+        if login is None or "access_token" not in login["cookies"]:
+            return 0
+        headers = {"Cookie": f"access_token={login['cookies']['access_token']}"}
+
+        viewers = options["viewers"]
+        finished = await asyncio.gather(
+            *(self.viewer(options["ramp"] * index / viewers, headers)
+              for index in range(viewers)))
+        return sum(finished)
+
+    async def request(self, endpoint, url, headers=None, **kwargs):
+        """
+        Performs one request and records its result under endpoint.
+
+        Returns the result, or None if the request failed.
+        """
+        try:
+            result = await fetch(url, headers, timeout=self.options["timeout"],
+                                 **kwargs)
+        except FETCH_ERRORS as exc:
+            self.results[endpoint].append({"error": type(exc).__name__})
+            return None
+        self.results[endpoint].append(result)
+        return result if result["status"] < 400 else None
+
+    async def viewer(self, delay, headers):
+        """
+        Picks a rendition and plays it, keeping the configured number of
+        seconds buffered. Returns whether playback completed.
+        """
+        await asyncio.sleep(delay)
+        options = self.options
+
+        master_url = urljoin(options["base_url"],
+                             f"/api/video/{options['video']}/master.m3u8/")
+        master = await self.request("master", master_url, headers, keep_body=True)
+        if master is None:
+            return False
+        playlist_url = self.pick_rendition(
+            master_url, parse_master_playlist(master["body"].decode()))
+        if playlist_url is None:
+            return False
+        playlist = await self.request("playlist", playlist_url, headers,
+                                      keep_body=True)
+        if playlist is None:
+            return False
+
+        init, segments = parse_media_playlist(playlist["body"].decode())
+        if init:
+            uri, byte_range = init
+            init_headers = {**headers, "Range": byte_range} if byte_range else headers
+            if await self.request("init", urljoin(playlist_url, uri),
+                                  init_headers) is None:
+                return False
+        return await self.play(playlist_url, segments, headers)
+
+    async def play(self, playlist_url, segments, headers):
+        """
+        Downloads segments no further than the buffer ahead of the playhead.
+
+        The playhead starts after the first segment; when a segment arrives
+        after the playhead has passed its start, the stall is recorded and
+        playback resumes from there.
+        """
+        options = self.options
+        speed = options["speed"]
+        buffered = 0.0
+        playback_start = None
+        for duration, uri, byte_range in segments:
+            if buffered >= options["watch"]:
+                break
+            if playback_start is not None:
+                position = (time.perf_counter() - playback_start) * speed
+                ahead = buffered - position - options["buffer"]
+                if ahead > 0:
+                    await asyncio.sleep(ahead / speed)
+
+            segment_headers = {**headers, "Range": byte_range} if byte_range else headers
+            if await self.request("segment", urljoin(playlist_url, uri),
+                                  segment_headers) is None:
+                return False
+
+            now = time.perf_counter()
+            if playback_start is None:
+                playback_start = now
+            else:
+                stall = (now - playback_start) * speed - buffered
+                if stall > 0:
+                    self.stalls.append(stall / speed)
+                    playback_start += stall / speed
+            buffered += duration
+        return True
+
+    def pick_rendition(self, master_url, variants):
+        """
+        Returns the playlist URL of the configured rendition.
+        """
+        if not variants:
+            return None
+        variants.sort()
+        rendition = self.options["rendition"]
+        if rendition == "lowest":
+            uri = variants[0][1]
+        elif rendition == "highest":
+            uri = variants[-1][1]
+        else:
+            uri = next((uri for _, uri in variants
+                        if f"/{rendition}/" in uri), None)
+            if uri is None:
+                return None
+        return urljoin(master_url, uri)
+
+    def print_report(self, report):
+        """
+        Prints one line per endpoint and the playback summary.
+        """
+        viewers = report["viewers"]
+        self.stdout.write(
+            f"Finished in {report['wall_seconds']:.1f}s, {viewers['completed']} "
+            f"viewers completed, {viewers['stalls']} stalls "
+            f"({viewers['stall_seconds']:.1f}s)")
+        self.stdout.write(
+            f"{'endpoint':<10}{'requests':>9}{'errors':>8}{'p50 ms':>9}"
+            f"{'p95 ms':>9}{'p99 ms':>9}{'Mbit/s':>9}")
+        for endpoint, summary in report["endpoints"].items():
+            latency = summary["total_ms"]
+            self.stdout.write(
+                f"{endpoint:<10}{summary['requests']:>9}"
+                f"{summary['error_rate'] * 100:>7.1f}%"
+                + "".join(f"{latency[key] if latency[key] is not None else '-':>9}"
+                          for key in ("p50", "p95", "p99"))
+                + f"{summary['throughput_mbit']:>9}")
@@ -0,0 +1,116 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from redis.exceptions import RedisError
+
+from core.periodic import ensure_periodic_jobs
+
+
+def available_cores():
+    """
+    Returns the number of CPU cores this process is allowed to run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class Command(BaseCommand):
+    """
+    Starts and supervises the RQ worker groups configured in RQ_WORKER_POOL
+    and keeps the RQ_PERIODIC_JOBS chains running.
+    """
+    help = "Run a pool of RQ workers sized to the available CPU cores."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--drain-timeout", type=int, default=3600,
+                            help="Seconds to wait for running jobs on shutdown.")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        workers = {}
+        for group in self.worker_groups():
+            workers[self.spawn(group)] = group
+
+        next_check = 0
+        while not self.stopping:
+            if time.monotonic() >= next_check:
+                try:
+                    ensure_periodic_jobs()
+                except RedisError as exc:
+                    self.stderr.write(f"Could not start periodic jobs: {exc}")
+                next_check = time.monotonic() + 60
+            for process, group in list(workers.items()):
+                if process.poll() is not None:
+                    self.stderr.write(
+                        f"Worker for {', '.join(group['queues'])} exited with "
+                        f"{process.returncode}, restarting")
+                    del workers[process]
+                    workers[self.spawn(group)] = group
+            time.sleep(1)
+
+        self.drain(workers, options["drain_timeout"])
+
+    def worker_groups(self):
+        """
+        Returns the RQ_WORKER_POOL group of every worker process to start.
+        """
+        transcode_slots = max(
+            1, available_cores() // settings.VIDEO_TRANSCODE_THREADS)
+        for group in settings.RQ_WORKER_POOL:
+            count = group["workers"]
+            if count == "auto":
+                count = transcode_slots
+            for _ in range(count):
+                yield group
+
+    def spawn(self, group):
+        """
+        Starts one rqworker process serving the queues of a group in
+        priority order, with the RQ scheduler if the group asks for it.
+
+        The worker runs in a session of its own, so a Ctrl-C on the terminal
+        reaches only the supervisor. RQ treats a second signal as a cold
+        shutdown; drain() must be the only one signalling the workers.
+        """
+        queues = group["queues"]
+        self.stdout.write(f"Starting worker for {', '.join(queues)}")
+        options = ["--with-scheduler"] if group.get("scheduler") else []
+        return subprocess.Popen(
+            [sys.executable, sys.argv[0], "rqworker", *options, *queues],
+            start_new_session=True)
+
+    def stop(self, signum, frame):
+        """
+        Flags the supervisor loop to stop and drain the workers.
+        """
+        self.stopping = True
+
+    def drain(self, workers, timeout):
+        """
+        Lets every worker finish its current job, then waits for it to exit.
+
+        RQ workers perform a warm shutdown on SIGTERM; workers still busy
+        after the timeout are killed.
+        """
+        self.stdout.write("Draining workers...")
+        for process in workers:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+
+        deadline = time.monotonic() + timeout
+        for process in workers:
+            try:
+                process.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self.stdout.write(self.style.SUCCESS("All workers stopped."))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:07
+
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_transcoded_videos_ready(apps, schema_editor):
+    """
+    Existing videos with a master playlist have already been transcoded.
+    """
+    Video = apps.get_model('videos_app', 'Video')
+    ready_ids = [
+        video.pk for video in Video.objects.only('pk', 'uuid')
+        if os.path.exists(os.path.join(
+            settings.MEDIA_ROOT, 'videos', str(video.uuid), 'master.m3u8'))
+    ]
+    Video.objects.filter(pk__in=ready_ids).update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos_app', '0003_alter_video_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('transcoding', 'Transcoding'), ('ready', 'Ready'), ('failed', 'Failed')], default='queued', max_length=20),
+        ),
+        migrations.RunPython(mark_transcoded_videos_ready,
+                             migrations.RunPython.noop),
+    ]
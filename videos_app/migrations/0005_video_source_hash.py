@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos_app', '0004_video_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='source_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos_app', '0006_videoupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:25
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vectors(apps, schema_editor):
+    """
+    Computes the search vector of the existing videos.
+    """
+    Video = apps.get_model('videos_app', 'Video')
+    config = settings.VIDEO_SEARCH_CONFIG
+    Video.objects.update(search_vector=(
+        SearchVector('title', weight='A', config=config)
+        + SearchVector('category', weight='B', config=config)
+        + SearchVector('description', weight='C', config=config)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos_app', '0008_video_catalog_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='video',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='video_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='video_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos_app', '0009_video_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.FloatField()),
+                ('duration', models.FloatField()),
+                ('updated_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_progress', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_progress', to='videos_app.video')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-updated_at'], name='watch_progress_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'video'), name='watch_progress_user_video_unique')],
+            },
+        ),
+    ]
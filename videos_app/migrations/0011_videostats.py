@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos_app', '0010_watchprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoStats',
+            fields=[
+                ('video', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='videos_app.video')),
+                ('play_count', models.PositiveBigIntegerField(default=0)),
+                ('unique_viewers', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'video stats',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:57
+
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_existing_trickplay(apps, schema_editor):
+    """
+    Existing videos whose trickplay index has been written already have it.
+    """
+    Video = apps.get_model('videos_app', 'Video')
+    trickplay_ids = [
+        video.pk for video in Video.objects.only('pk', 'uuid')
+        if os.path.exists(os.path.join(
+            settings.MEDIA_ROOT, 'videos', str(video.uuid), 'trickplay',
+            'thumbnails.vtt'))
+    ]
+    Video.objects.filter(pk__in=trickplay_ids).update(has_trickplay=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos_app', '0011_videostats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='has_trickplay',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_existing_trickplay,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos_app', '0012_video_has_trickplay'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoupload',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,5 +1,8 @@
 import uuid
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.conf import settings
 from django.db import models
 
 
@@ -12,6 +15,12 @@ def video_file_path(instance, filename):
 
 
 class Video(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        TRANSCODING = 'transcoding', 'Transcoding'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     title = models.CharField(max_length=255)
@@ -20,6 +29,112 @@ class Video(models.Model):
     category = models.CharField(max_length=50)
     video_file = models.FileField(
         upload_to=video_file_path, blank=True, null=True)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.QUEUED)
+    source_hash = models.CharField(
+        max_length=64, blank=True, db_index=True, editable=False)
+    thumbnail_derivatives = models.JSONField(
+        default=dict, blank=True, editable=False)
+    has_trickplay = models.BooleanField(default=False, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"],
+                         name="video_created_idx"),
+            models.Index(fields=["category", "-created_at", "-id"],
+                         name="video_category_created_idx"),
+            models.Index(fields=["status", "-created_at", "-id"],
+                         name="video_status_created_idx"),
+            GinIndex(fields=["search_vector"], name="video_search_idx"),
+            GinIndex(fields=["title"], opclasses=["gin_trgm_ops"],
+                     name="video_title_trgm_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} in category {self.category}"
+
+
+class VideoUpload(models.Model):
+    """
+    A resumable upload of a source file that becomes a Video once complete.
+
+    Chunks are appended directly to the final videos/<uuid>/<filename>
+    location; the Video created on completion reuses the upload uuid.
+    Uploads without a chunk for VIDEO_UPLOAD_EXPIRY seconds are removed by
+    the periodic expire_stale_uploads job.
+    """
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    thumbnail = models.ImageField(upload_to='thumbnails/')
+    category = models.CharField(max_length=50)
+    video = models.OneToOneField(
+        Video, on_delete=models.SET_NULL, blank=True, null=True,
+        related_name='upload')
+
+    @property
+    def file_name(self):
+        """
+        Returns the storage name of the uploaded source file.
+        """
+        return video_file_path(self, self.filename)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size} bytes)"
+
+
+class WatchProgress(models.Model):
+    """
+    The last playback position of a user in a video, for resuming playback.
+
+    Positions are written to Redis first and flushed here in bulk by the
+    periodic flush_watch_progress job.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='watch_progress')
+    video = models.ForeignKey(
+        Video, on_delete=models.CASCADE, related_name='watch_progress')
+    position = models.FloatField()
+    duration = models.FloatField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "video"],
+                                    name="watch_progress_user_video_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-updated_at"],
+                         name="watch_progress_recent_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} at {self.position:.0f}s of {self.video.title}"
+
+
+class VideoStats(models.Model):
+    """
+    Play counts of a video, rolled up from Redis by the periodic
+    rollup_video_stats job.
+
+    Plays are never counted on Video itself, so playback does not contend
+    for video row locks.
+    """
+    video = models.OneToOneField(
+        Video, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    play_count = models.PositiveBigIntegerField(default=0)
+    unique_viewers = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "video stats"
+
+    def __str__(self):
+        return f"{self.video.title}: {self.play_count} plays"
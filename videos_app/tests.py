@@ -1,3 +1,264 @@
-from django.test import TestCase
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from videos_app.api.signing import sign_video, signed_expiry, verify_video_signature
+from videos_app.api.tasks import expire_stale_uploads
+from videos_app.api.uploads import upload_lock
+from videos_app.api.utils import file_response, offloaded_response, parse_range
+from videos_app.models import Video, VideoUpload
+
+
+class ParseRangeTests(SimpleTestCase):
+    """
+    Tests for parsing single-range Range headers.
+    """
+
+    def test_closed_range(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+
+    def test_end_is_clamped_to_size(self):
+        self.assertEqual(parse_range("bytes=900-5000", 1000), (900, 999))
+
+    def test_open_ended_range(self):
+        self.assertEqual(parse_range("bytes=500-", 1000), (500, 999))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+
+    def test_suffix_longer_than_file(self):
+        self.assertEqual(parse_range("bytes=-5000", 1000), (0, 999))
+
+    def test_missing_or_multiple_ranges_are_ignored(self):
+        self.assertIsNone(parse_range(None, 1000))
+        self.assertIsNone(parse_range("bytes=-", 1000))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 1000))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ("bytes=1000-", "bytes=5-2", "bytes=-0"):
+            with self.subTest(header=header):
+                with self.assertRaises(ValueError):
+                    parse_range(header, 1000)
+
+
+class SigningTests(SimpleTestCase):
+    """
+    Tests for signed segment URLs.
+    """
+    video_uuid = "6f1c1d64-9a51-4d6b-a1b4-2f3c9e0b7d21"
+
+    def test_valid_signature(self):
+        expires = signed_expiry()
+        signature = sign_video(self.video_uuid, expires)
+        self.assertTrue(verify_video_signature(self.video_uuid, expires, signature))
+
+    def test_expired_signature(self):
+        expires = int(time.time()) - 1
+        signature = sign_video(self.video_uuid, expires)
+        self.assertFalse(verify_video_signature(self.video_uuid, expires, signature))
+
+    def test_tampered_signature(self):
+        expires = signed_expiry()
+        signature = sign_video(self.video_uuid, expires)
+        tampered = ("0" if signature[0] != "0" else "1") + signature[1:]
+        self.assertFalse(verify_video_signature(self.video_uuid, expires, tampered))
+        self.assertFalse(verify_video_signature(self.video_uuid, expires + 600, signature))
+        self.assertFalse(verify_video_signature(
+            "0b5e7f0a-1c2d-4e3f-8a9b-0c1d2e3f4a5b", expires, signature))
+
+    @override_settings(VIDEO_SIGNED_URL_TTL=3600, VIDEO_SIGNED_URL_WINDOW=600)
+    def test_expiry_is_rounded_up_to_the_window(self):
+        expires = signed_expiry()
+        self.assertEqual(expires % 600, 0)
+        self.assertGreaterEqual(expires, time.time() + 3600)
+
+
+class FileResponseTests(SimpleTestCase):
+    """
+    Tests for serving media files directly and through the front proxy.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.segment_dir = os.path.join(self.media_root, "videos", "abc", "360p")
+        os.makedirs(self.segment_dir)
+        self.path = os.path.join(self.segment_dir, "segment_000.ts")
+        self.content = bytes(range(256)) * 4
+        with open(self.path, "wb") as f:
+            f.write(self.content)
+        self.factory = RequestFactory()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    @override_settings(VIDEO_DELIVERY_MODE="x-accel-redirect",
+                       VIDEO_ACCEL_REDIRECT_PREFIX="/protected-media/")
+    def test_x_accel_redirect(self):
+        response = file_response(self.factory.get("/"), self.path, "video/mp2t",
+                                 "private, max-age=60")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"],
+                         "/protected-media/videos/abc/360p/segment_000.ts")
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["Content-Type"], "video/mp2t")
+        self.assertEqual(response["Cache-Control"], "private, max-age=60")
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    @override_settings(VIDEO_DELIVERY_MODE="x-sendfile")
+    def test_x_sendfile(self):
+        response = offloaded_response(self.path, "video/mp2t")
+        self.assertEqual(response["X-Sendfile"], self.path)
+        self.assertNotIn("X-Accel-Redirect", response)
+        self.assertEqual(response.content, b"")
+
+    @override_settings(VIDEO_DELIVERY_MODE="x-accel-redirect")
+    def test_offloaded_conditional_request(self):
+        etag = file_response(self.factory.get("/"), self.path, "video/mp2t")["ETag"]
+        response = file_response(
+            self.factory.get("/", headers={"If-None-Match": etag}),
+            self.path, "video/mp2t")
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn("X-Accel-Redirect", response)
+
+    @override_settings(VIDEO_DELIVERY_MODE="direct")
+    def test_direct_range(self):
+        response = file_response(
+            self.factory.get("/", headers={"Range": "bytes=10-19"}),
+            self.path, "video/mp2t")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.content)}")
+        self.assertEqual(b"".join(response.streaming_content), self.content[10:20])
+
+    @override_settings(VIDEO_DELIVERY_MODE="direct")
+    def test_unsatisfiable_range(self):
+        response = file_response(
+            self.factory.get("/", headers={"Range": f"bytes={len(self.content)}-"}),
+            self.path, "video/mp2t")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.content)}")
+
+    def test_missing_file_and_directory_are_not_found(self):
+        for path in (os.path.join(self.segment_dir, "missing.ts"), self.segment_dir):
+            with self.subTest(path=path):
+                with self.assertRaises(Http404):
+                    file_response(self.factory.get("/"), path, "video/mp2t")
+
+
+def upload_checksum(data):
+    """
+    Returns the Upload-Checksum header value of a chunk.
+    """
+    return "sha256 " + base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+class ResumableUploadTests(TestCase):
+    """
+    Tests for the resumable upload protocol.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        admin = get_user_model().objects.create_superuser(
+            "admin", "admin@example.com", "password")
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.upload = VideoUpload.objects.create(
+            filename="movie.mp4", size=10, title="Movie", description="A movie",
+            thumbnail=SimpleUploadedFile("thumbnail.jpg", b"jpeg"),
+            category="Drama")
+        self.url = reverse("video-upload", args=[self.upload.uuid])
+        self.path = os.path.join(self.media_root, self.upload.file_name)
+
+    def send_chunk(self, data, offset, checksum=None):
+        return self.client.generic(
+            "PATCH", self.url, data,
+            content_type="application/offset+octet-stream",
+            headers={"Upload-Offset": str(offset),
+                     "Upload-Checksum": checksum or upload_checksum(data)})
+
+    def assert_file_content(self, content):
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), content)
+
+    def test_empty_upload_is_rejected(self):
+        response = self.client.post(reverse("video-upload-create"), {
+            "filename": "empty.mp4", "size": 0, "title": "Empty",
+            "description": "Empty", "category": "Drama",
+            "thumbnail": SimpleUploadedFile("thumbnail.jpg", b"jpeg"),
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("size", response.data)
+
+    def test_chunks_resume_and_complete_the_upload(self):
+        response = self.send_chunk(b"01234", 0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Upload-Offset"], "5")
+        self.assertEqual(self.client.get(self.url)["Upload-Offset"], "5")
+
+        response = self.send_chunk(b"56789", 5)
+        self.assertEqual(response.status_code, 200)
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.offset, 10)
+        self.assertEqual(self.upload.video.uuid, self.upload.uuid)
+        self.assertEqual(self.upload.video.status, Video.Status.QUEUED)
+        self.assert_file_content(b"0123456789")
+
+    def test_wrong_offset_conflicts_and_leaves_the_file_unchanged(self):
+        self.send_chunk(b"01234", 0)
+        response = self.send_chunk(b"34567", 3)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Upload-Offset"], "5")
+        self.assert_file_content(b"01234")
+
+    def test_checksum_mismatch_truncates_to_the_previous_offset(self):
+        self.send_chunk(b"01234", 0)
+        response = self.send_chunk(b"56789", 5, upload_checksum(b"other"))
+        self.assertEqual(response.status_code, 400)
+        self.assert_file_content(b"01234")
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.offset, 5)
+
+    def test_chunk_exceeding_the_size_is_rejected(self):
+        response = self.send_chunk(b"0123456789ab", 0)
+        self.assertEqual(response.status_code, 413)
+        self.assert_file_content(b"")
+
+    def test_concurrent_chunk_conflicts(self):
+        lock = upload_lock(self.upload.uuid)
+        self.assertTrue(lock.acquire(blocking=False))
+        self.addCleanup(lock.release)
+        response = self.send_chunk(b"01234", 0)
+        self.assertEqual(response.status_code, 409)
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.offset, 0)
+
+    def test_stale_uploads_expire(self):
+        self.send_chunk(b"01234", 0)
+        thumbnail_path = self.upload.thumbnail.path
+        expire_stale_uploads()
+        self.assertTrue(VideoUpload.objects.filter(pk=self.upload.pk).exists())
+
+        VideoUpload.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        expire_stale_uploads()
+        self.assertFalse(VideoUpload.objects.filter(pk=self.upload.pk).exists())
+        self.assertFalse(os.path.exists(os.path.dirname(self.path)))
+        self.assertFalse(os.path.exists(thumbnail_path))